@@ -0,0 +1,120 @@
+"""
+KINESYS — Request Coalescer
+
+Shared by LLMClient and VLMClient when created with ``batch=True``.
+Requests are queued, and a background task collects up to ``max_size``
+of them (or whatever arrives within ``window_s``) into a round. Each
+round is dispatched concurrently. None of the providers accept several
+prompts in one call, so this amortizes scheduling, not requests.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from typing import Any, Awaitable, Callable, Generic, TypeVar
+
+logger = logging.getLogger("kinesys.batching")
+
+T = TypeVar("T")
+
+_Request = tuple[tuple[Any, ...], "asyncio.Future[Any]"]
+
+
+class RequestCoalescer(Generic[T]):
+    """
+    Queue requests for ``dispatch`` and send them in concurrent rounds.
+
+    ``aclose`` settles every request it drops: queued ones, ones in the
+    round being collected, and ones already dispatched are all cancelled,
+    so no caller awaiting ``submit`` is left hanging.
+    """
+
+    def __init__(
+        self,
+        dispatch: Callable[..., Awaitable[T]],
+        max_size: int,
+        window_s: float,
+        label: str = "",
+    ) -> None:
+        self._dispatch = dispatch
+        self.max_size = max_size
+        self.window_s = window_s
+        self._label = label
+        # Created lazily so they bind to the running event loop
+        self._queue: asyncio.Queue[_Request] | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._round: list[_Request] = []
+        self._inflight: set[asyncio.Task[None]] = set()
+
+    async def submit(self, args: tuple[Any, ...]) -> T:
+        """Queue a request for the coalescer and wait for its result."""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(self._queue))
+
+        future: asyncio.Future[T] = asyncio.get_running_loop().create_future()
+        await self._queue.put((args, future))
+        return await future
+
+    async def _run(self, queue: asyncio.Queue[_Request]) -> None:
+        """Collect queued requests into rounds and dispatch each round concurrently."""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            self._round = [await queue.get()]
+            deadline = loop.time() + self.window_s
+            while len(self._round) < self.max_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    self._round.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            round_, self._round = self._round, []
+            logger.debug("Dispatching batch of %d %s requests", len(round_), self._label)
+            for args, future in round_:
+                # Don't await the round: the next one can fill while this runs
+                task = asyncio.create_task(self._resolve(args, future))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+
+    async def _resolve(self, args: tuple[Any, ...], future: asyncio.Future[T]) -> None:
+        try:
+            if not future.cancelled():
+                result = await self._dispatch(*args)
+                if not future.done():
+                    future.set_result(result)
+        except Exception as exc:
+            if not future.done():
+                future.set_exception(exc)
+        finally:
+            if not future.done():  # cancelled mid-dispatch
+                future.cancel()
+
+    async def aclose(self) -> None:
+        """Stop the coalescer and cancel every request that has not finished."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+        dropped = self._round
+        self._round = []
+        if self._queue is not None:
+            while not self._queue.empty():
+                dropped.append(self._queue.get_nowait())
+            self._queue = None
+        for _, future in dropped:
+            if not future.done():
+                future.cancel()
+
+        inflight = list(self._inflight)
+        for task in inflight:
+            task.cancel()
+        await asyncio.gather(*inflight, return_exceptions=True)
@@ -5,20 +5,32 @@ Supports Groq API (primary) and Ollama (fallback). Auto-switches to
 Ollama if Groq returns a rate limit error (HTTP 429).
 
 Usage:
-    client = LLMClient()
-    response = await client.chat("What is 2+2?")
+    async with LLMClient() as client:
+        response = await client.chat([{"role": "user", "content": "What is 2+2?"}])
+
+Standalone scripts should call configure_event_loop() before asyncio.run()
+so the shared HTTP client is created on a uvloop event loop. (uvicorn
+already selects uvloop when it is installed.)
 """
 
 from __future__ import annotations
 
-import json
+import asyncio
+import hashlib
 import logging
 import os
+import random
+import re
+import time
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any
+from typing import Any, AsyncIterator, Iterable, Protocol
 
 import httpx
+import orjson
+
+from ai.batching import RequestCoalescer
 
 logger = logging.getLogger("kinesys.llm")
 
@@ -35,9 +47,45 @@ GEMINI_API_BASE = "https://generativelanguage.googleapis.com/v1"
 
 GROQ_API_BASE = "https://api.groq.com/openai/v1"
 GROQ_MAX_RETRIES = 2
+GROQ_MAX_BACKOFF_S = 30.0
 GROQ_TIMEOUT_S = 30.0
 OLLAMA_TIMEOUT_S = 60.0
 GEMINI_TIMEOUT_S = 30.0
+# Max simultaneous in-flight requests per provider (override via env)
+GROQ_MAX_INFLIGHT = int(os.environ.get("GROQ_MAX_INFLIGHT", "8"))
+GEMINI_MAX_INFLIGHT = int(os.environ.get("GEMINI_MAX_INFLIGHT", "8"))
+OLLAMA_MAX_INFLIGHT = int(os.environ.get("OLLAMA_MAX_INFLIGHT", "4"))
+
+# Cooldown after a cloud provider fails: doubles per consecutive failure
+PROVIDER_COOLDOWN_S = 60.0
+PROVIDER_MAX_COOLDOWN_S = 300.0
+
+HEDGE_DELAY_S = 0.5  # head start Groq gets before Gemini is raced against it
+
+BATCH_MAX = 8  # requests coalesced into one dispatch round (batch=True only)
+BATCH_WINDOW_MS = 20.0  # how long the coalescer waits to fill a round
+
+RESPONSE_CACHE_SIZE = 512
+# At or below this, responses are treated as deterministic. Kept under the
+# decomposer's first-attempt temperature (0.1) so answers that may still fail
+# validation are not replayed for every identical command.
+CACHE_MAX_TEMPERATURE = 0.05
+
+# Payloads are pre-encoded with orjson, so the content type is set explicitly
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Shared connection pool used by every provider (see get_shared_client)
+HTTP_POOL_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=20,
+    keepalive_expiry=300,
+)
+HTTP_DEFAULT_TIMEOUT = httpx.Timeout(connect=5.0, read=60.0, write=30.0, pool=10.0)
+# Transport for non-streaming POSTs: "httpx" (default) or "aiohttp" (see get_http_backend)
+HTTP_BACKEND = os.environ.get("LLM_HTTP_BACKEND", "httpx").lower()
+
+# Markdown code fences (```json ... ```) that models wrap around JSON output
+_FENCE_RE = re.compile(r"^\s*```[A-Za-z]*[ \t]*\n?|\n?```\s*$", re.MULTILINE)
 
 
 class LLMProvider(Enum):
@@ -46,7 +94,7 @@ class LLMProvider(Enum):
     OLLAMA = "ollama"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class LLMResponse:
     """Structured response from the LLM."""
 
@@ -55,33 +103,224 @@ class LLMResponse:
     model: str
     usage: dict[str, int] = field(default_factory=dict)
     raw: dict[str, Any] = field(default_factory=dict)
+    # Memoized is_valid_json result (cached_property needs a __dict__)
+    _valid_json: bool | None = field(default=None, init=False, repr=False, compare=False)
 
     @property
     def is_valid_json(self) -> bool:
-        try:
-            json.loads(self.content)
-            return True
-        except (json.JSONDecodeError, TypeError):
-            return False
+        if self._valid_json is None:
+            try:
+                orjson.loads(self.content)
+                valid = True
+            except (orjson.JSONDecodeError, TypeError):
+                valid = False
+            object.__setattr__(self, "_valid_json", valid)
+        return self._valid_json
 
     def parse_json(self) -> Any:
         """Parse the content as JSON. Raises ValueError on failure."""
+        # Fast path: json_mode output is bare JSON, and orjson tolerates the
+        # surrounding whitespace, so skip the fence regex and the copy
+        if self.content.lstrip()[:1] in ("{", "["):
+            try:
+                return orjson.loads(self.content)
+            except orjson.JSONDecodeError:
+                pass
+
         # Strip markdown code fences if present
-        text = self.content.strip()
-        if text.startswith("```"):
-            lines = text.split("\n")
-            # Remove first line (```json) and last line (```)
-            lines = [l for l in lines if not l.strip().startswith("```")]
-            text = "\n".join(lines).strip()
+        text = _FENCE_RE.sub("", self.content).strip()
 
         try:
-            return json.loads(text)
-        except json.JSONDecodeError as exc:
+            return orjson.loads(text)
+        except (orjson.JSONDecodeError, ValueError) as exc:
             raise ValueError(
                 f"LLM response is not valid JSON: {exc}\nContent: {text[:500]}"
             ) from exc
 
 
+# ---------------------------------------------------------------------------
+# Event loop + shared HTTP client
+# ---------------------------------------------------------------------------
+
+
+def configure_event_loop() -> bool:
+    """
+    Install uvloop as the asyncio event loop policy if it is available.
+
+    Must run before asyncio.run() and before get_shared_client() is first
+    called. Returns True if uvloop was installed.
+    """
+    try:
+        import uvloop
+    except ImportError:
+        logger.debug("uvloop not installed — using the default asyncio loop")
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
+
+_shared_client: httpx.AsyncClient | None = None
+
+
+def get_shared_client() -> httpx.AsyncClient:
+    """
+    Return the process-wide pooled HTTP/2 client, creating it on first use.
+
+    All providers share this client so TCP+TLS connections to each API host
+    are reused across requests instead of being rebuilt per provider.
+    """
+    global _shared_client
+    if _shared_client is None or _shared_client.is_closed:
+        _shared_client = httpx.AsyncClient(
+            http2=True,
+            limits=HTTP_POOL_LIMITS,
+            timeout=HTTP_DEFAULT_TIMEOUT,
+        )
+    return _shared_client
+
+
+async def close_shared_client() -> None:
+    """Close the shared HTTP client(s). Call once on application shutdown."""
+    global _shared_client, _http_backend
+    if _http_backend is not None:
+        await _http_backend.aclose()
+        _http_backend = None
+    if _shared_client is not None and not _shared_client.is_closed:
+        await _shared_client.aclose()
+    _shared_client = None
+
+
+class HttpBackend(Protocol):
+    """
+    Transport used for non-streaming provider POSTs.
+
+    Implementations return an ``httpx.Response`` and raise httpx exceptions
+    (TimeoutException, ConnectError, HTTPStatusError via raise_for_status)
+    so provider error handling is identical whichever backend is active.
+    """
+
+    async def post(
+        self, url: str, *, content: bytes, headers: dict[str, str], timeout: float
+    ) -> httpx.Response: ...
+
+    async def aclose(self) -> None: ...
+
+
+class HttpxBackend:
+    """Default backend: the shared pooled HTTP/2 httpx client."""
+
+    async def post(
+        self, url: str, *, content: bytes, headers: dict[str, str], timeout: float
+    ) -> httpx.Response:
+        return await get_shared_client().post(
+            url, content=content, headers=headers, timeout=timeout
+        )
+
+    async def aclose(self) -> None:
+        pass  # the shared client is closed by close_shared_client()
+
+
+# Describe the body as it came off the wire; wrong once aiohttp has decoded it
+_WIRE_ONLY_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding"})
+
+
+def _wrap_decoded_response(
+    status: int,
+    headers: Iterable[tuple[str, str]],
+    body: bytes,
+    request: httpx.Request,
+) -> httpx.Response:
+    """
+    Wrap an already-decompressed body in an ``httpx.Response``.
+
+    aiohttp inflates gzip/deflate bodies itself; keeping Content-Encoding
+    would make httpx try to decode them a second time and fail.
+    """
+    return httpx.Response(
+        status,
+        headers=[(k, v) for k, v in headers if k.lower() not in _WIRE_ONLY_HEADERS],
+        content=body,
+        request=request,
+    )
+
+
+class AiohttpBackend:
+    """
+    aiohttp backend for high fan-out of small requests (HTTP/1.1 only).
+
+    Responses are wrapped in ``httpx.Response`` and errors mapped to httpx
+    exceptions, so callers don't need to know which backend served them.
+    """
+
+    def __init__(self) -> None:
+        import aiohttp
+
+        self._aiohttp = aiohttp
+        self._session: aiohttp.ClientSession | None = None
+
+    def _get_session(self) -> Any:
+        if self._session is None or self._session.closed:
+            aiohttp = self._aiohttp
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=HTTP_POOL_LIMITS.max_connections,
+                    keepalive_timeout=HTTP_POOL_LIMITS.keepalive_expiry,
+                    enable_cleanup_closed=True,
+                ),
+                timeout=aiohttp.ClientTimeout(total=60),
+            )
+        return self._session
+
+    async def post(
+        self, url: str, *, content: bytes, headers: dict[str, str], timeout: float
+    ) -> httpx.Response:
+        request = httpx.Request("POST", url)
+        try:
+            async with self._get_session().post(
+                url,
+                data=content,
+                headers=headers,
+                timeout=self._aiohttp.ClientTimeout(total=timeout),
+            ) as resp:
+                body = await resp.read()
+                return _wrap_decoded_response(
+                    resp.status, resp.headers.items(), body, request
+                )
+        except asyncio.TimeoutError as exc:
+            raise httpx.ReadTimeout("aiohttp request timed out", request=request) from exc
+        except self._aiohttp.ClientConnectionError as exc:
+            raise httpx.ConnectError(str(exc), request=request) from exc
+
+    async def aclose(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+_http_backend: HttpBackend | None = None
+
+
+def get_http_backend() -> HttpBackend:
+    """
+    Return the process-wide backend for non-streaming provider POSTs.
+
+    Selected by LLM_HTTP_BACKEND: "httpx" (default) or "aiohttp". Falls back
+    to httpx if aiohttp is requested but not installed. Streaming always
+    goes through the shared httpx client.
+    """
+    global _http_backend
+    if _http_backend is None:
+        if HTTP_BACKEND == "aiohttp":
+            try:
+                _http_backend = AiohttpBackend()
+            except ImportError:
+                logger.warning("LLM_HTTP_BACKEND=aiohttp but aiohttp is not installed — using httpx")
+                _http_backend = HttpxBackend()
+        else:
+            _http_backend = HttpxBackend()
+    return _http_backend
+
+
 # ---------------------------------------------------------------------------
 # Groq Client
 # ---------------------------------------------------------------------------
@@ -93,19 +332,21 @@ class GroqClient:
     def __init__(self, api_key: str | None = None, model: str | None = None) -> None:
         self.api_key = api_key or os.environ.get("GROQ_API_KEY", "")
         self.model = model or GROQ_DEFAULT_MODEL
-        self._http: httpx.AsyncClient | None = None
+        self._sem = asyncio.Semaphore(GROQ_MAX_INFLIGHT)
+        self._headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+        # Per-call payloads are shallow copies of this, so key order is stable
+        self._payload_template: dict[str, Any] = {
+            "model": self.model,
+            "messages": None,
+            "temperature": None,
+            "max_tokens": None,
+        }
 
     async def _get_http(self) -> httpx.AsyncClient:
-        if self._http is None or self._http.is_closed:
-            self._http = httpx.AsyncClient(
-                base_url=GROQ_API_BASE,
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                },
-                timeout=GROQ_TIMEOUT_S,
-            )
-        return self._http
+        return get_shared_client()
 
     async def chat(
         self,
@@ -113,69 +354,91 @@ class GroqClient:
         temperature: float = 0.1,
         max_tokens: int = 2048,
         json_mode: bool = False,
+        include_raw: bool = False,
     ) -> LLMResponse:
         """Send a chat completion request to Groq."""
         if not self.api_key:
             raise ValueError("GROQ_API_KEY not set. Set it in .env or environment.")
 
-        http = await self._get_http()
+        http = get_http_backend()
 
-        payload: dict[str, Any] = {
-            "model": self.model,
-            "messages": messages,
-            "temperature": temperature,
-            "max_tokens": max_tokens,
-        }
+        payload = self._payload_template.copy()
+        payload["messages"] = messages
+        payload["temperature"] = temperature
+        payload["max_tokens"] = max_tokens
         if json_mode:
             payload["response_format"] = {"type": "json_object"}
 
+        headers = {
+            **self._headers,
+            "Idempotency-Key": _idempotency_key(
+                self.model, messages, temperature, max_tokens, json_mode
+            ),
+        }
+        # Encoded once; re-encoded, with a fresh key, only on model fallback
+        body = orjson.dumps(payload)
+
         for attempt in range(GROQ_MAX_RETRIES + 1):
             try:
-                resp = await http.post("/chat/completions", json=payload)
+                async with self._sem:
+                    resp = await http.post(
+                        f"{GROQ_API_BASE}/chat/completions",
+                        content=body,
+                        headers=headers,
+                        timeout=GROQ_TIMEOUT_S,
+                    )
 
                 if resp.status_code == 429:
                     logger.warning("Groq rate limited (429). Attempt %d/%d",
                                    attempt + 1, GROQ_MAX_RETRIES + 1)
                     if attempt < GROQ_MAX_RETRIES:
-                        import asyncio
-                        await asyncio.sleep(2 ** attempt)
+                        await asyncio.sleep(_retry_delay(resp, attempt))
                         continue
                     raise RateLimitError("Groq rate limit exceeded after retries")
 
                 if resp.status_code == 400:
-                    # Model might not exist, try fallback model
-                    error_body = resp.json()
-                    error_msg = error_body.get("error", {}).get("message", "")
-                    if "model" in error_msg.lower() or "not found" in error_msg.lower():
-                        logger.warning("Model %s not available, trying %s",
-                                       self.model, GROQ_FALLBACK_MODEL)
-                        payload["model"] = GROQ_FALLBACK_MODEL
-                        self.model = GROQ_FALLBACK_MODEL
-                        continue
+                    # Model might not exist, try fallback model. Sniff the raw
+                    # bytes first so other 400s (auth, bad payload) skip the parse.
+                    error_raw = resp.content.lower()
+                    if b"model" in error_raw or b"not found" in error_raw:
+                        error_body = orjson.loads(resp.content)
+                        error_msg = error_body.get("error", {}).get("message", "").lower()
+                        if "model" in error_msg or "not found" in error_msg:
+                            logger.warning("Model %s not available, trying %s",
+                                           self.model, GROQ_FALLBACK_MODEL)
+                            payload["model"] = GROQ_FALLBACK_MODEL
+                            self._payload_template["model"] = GROQ_FALLBACK_MODEL
+                            self.model = GROQ_FALLBACK_MODEL
+                            body = orjson.dumps(payload)
+                            headers = {
+                                **self._headers,
+                                "Idempotency-Key": _idempotency_key(
+                                    self.model, messages, temperature, max_tokens, json_mode
+                                ),
+                            }
+                            continue
                     resp.raise_for_status()
 
                 resp.raise_for_status()
-                data = resp.json()
+                data = orjson.loads(resp.content)
 
-                content = data["choices"][0]["message"]["content"]
-                usage = data.get("usage", {})
+                message = data["choices"][0]["message"]
+                model = data.get("model", self.model)
+                get_usage = (data.get("usage") or {}).get
+                total_tokens = get_usage("total_tokens", 0)
 
-                logger.info(
-                    "Groq response: model=%s tokens=%s",
-                    data.get("model", self.model),
-                    usage.get("total_tokens", "?"),
-                )
+                logger.info("Groq response: model=%s tokens=%s", model, total_tokens)
 
                 return LLMResponse(
-                    content=content,
+                    content=message["content"],
                     provider=LLMProvider.GROQ,
-                    model=data.get("model", self.model),
+                    model=model,
                     usage={
-                        "prompt_tokens": usage.get("prompt_tokens", 0),
-                        "completion_tokens": usage.get("completion_tokens", 0),
-                        "total_tokens": usage.get("total_tokens", 0),
+                        "prompt_tokens": get_usage("prompt_tokens", 0),
+                        "completion_tokens": get_usage("completion_tokens", 0),
+                        "total_tokens": total_tokens,
                     },
-                    raw=data,
+                    raw=data if include_raw else {},
                 )
 
             except httpx.TimeoutException:
@@ -187,35 +450,111 @@ class GroqClient:
 
         raise RuntimeError("Groq request failed after all retries")
 
+    async def chat_stream(
+        self,
+        messages: list[dict[str, str]],
+        temperature: float = 0.1,
+        max_tokens: int = 2048,
+        json_mode: bool = False,
+    ) -> AsyncIterator[str]:
+        """Stream completion text from Groq as server-sent event deltas arrive."""
+        if not self.api_key:
+            raise ValueError("GROQ_API_KEY not set. Set it in .env or environment.")
+
+        http = await self._get_http()
+
+        payload = self._payload_template.copy()
+        payload["messages"] = messages
+        payload["temperature"] = temperature
+        payload["max_tokens"] = max_tokens
+        payload["stream"] = True
+        if json_mode:
+            payload["response_format"] = {"type": "json_object"}
+
+        async with self._sem:
+            async with http.stream(
+                "POST",
+                f"{GROQ_API_BASE}/chat/completions",
+                content=orjson.dumps(payload),
+                headers=self._headers,
+                timeout=GROQ_TIMEOUT_S,
+            ) as resp:
+                if resp.status_code == 429:
+                    raise RateLimitError("Groq rate limit exceeded")
+                resp.raise_for_status()
+
+                async for line in resp.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    event = line[5:].strip()
+                    if event == "[DONE]":
+                        break
+                    delta = orjson.loads(event)["choices"][0].get("delta") or {}
+                    text = delta.get("content")
+                    if text:
+                        yield text
+
     async def close(self) -> None:
-        if self._http and not self._http.is_closed:
-            await self._http.aclose()
+        # The pooled client is shared; it is closed by close_shared_client()
+        pass
 
 
 class RateLimitError(Exception):
     """Raised when Groq rate limit is exceeded."""
 
 
+def _retry_delay(resp: httpx.Response, attempt: int) -> float:
+    """
+    Seconds to wait before retrying a 429.
+
+    Honors the server's Retry-After header when present; otherwise uses
+    exponential backoff with full jitter so concurrent callers that hit the
+    same rate-limit window do not retry in lockstep.
+    """
+    retry_after = resp.headers.get("retry-after")
+    if retry_after:
+        try:
+            return min(GROQ_MAX_BACKOFF_S, max(0.0, float(retry_after)))
+        except ValueError:
+            pass  # HTTP-date form — fall back to jittered backoff
+    return min(GROQ_MAX_BACKOFF_S, (2 ** attempt) * (0.5 + random.random()))
+
+
+def _idempotency_key(
+    model: str,
+    messages: list[dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    json_mode: bool,
+) -> str:
+    """
+    Client-generated Idempotency-Key for one logical chat request.
+
+    Reused across retry attempts of the same body, so a retry after a lost
+    response can be recognized as a duplicate upstream. Covers every field
+    that changes the body; a new model needs a new key.
+    """
+    body = orjson.dumps((model, messages, temperature, max_tokens, json_mode))
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
 # ---------------------------------------------------------------------------
 # Gemini Client
 # ---------------------------------------------------------------------------
 
 
+# OpenAI chat roles → Gemini content roles (system is folded into the first user turn)
+_GEMINI_ROLE = {"user": "user", "assistant": "model"}
+
+
 class GeminiClient:
     """Async client for Google Gemini API (REST generateContent endpoint)."""
 
     def __init__(self, api_key: str | None = None, model: str | None = None) -> None:
         self.api_key = api_key or os.environ.get("GEMINI_API_KEY", "")
         self.model = model or GEMINI_DEFAULT_MODEL
-        self._http: httpx.AsyncClient | None = None
-
-    async def _get_http(self) -> httpx.AsyncClient:
-        if self._http is None or self._http.is_closed:
-            self._http = httpx.AsyncClient(
-                base_url=GEMINI_API_BASE,
-                timeout=GEMINI_TIMEOUT_S,
-            )
-        return self._http
+        self._sem = asyncio.Semaphore(GEMINI_MAX_INFLIGHT)
+        self._url = f"{GEMINI_API_BASE}/models/{self.model}:generateContent?key={self.api_key}"
 
     async def chat(
         self,
@@ -223,30 +562,29 @@ class GeminiClient:
         temperature: float = 0.1,
         max_tokens: int = 2048,
         json_mode: bool = False,
+        include_raw: bool = False,
     ) -> LLMResponse:
         """Send a chat request to Gemini generateContent API."""
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY not set.")
 
-        http = await self._get_http()
+        http = get_http_backend()
 
         # Convert OpenAI-style messages to Gemini contents format
-        # System prompt becomes the first user turn with a special prefix
-        contents = []
-        system_text = ""
-        for msg in messages:
-            role = msg.get("role", "user")
-            text = msg.get("content", "")
-            if role == "system":
-                system_text = text
-            elif role == "user":
-                # Prepend system text to first user message
-                if system_text:
-                    text = system_text + "\n\n" + text
-                    system_text = ""
-                contents.append({"role": "user", "parts": [{"text": text}]})
-            elif role == "assistant":
-                contents.append({"role": "model", "parts": [{"text": text}]})
+        # System prompt is prepended to the first user turn
+        system_text = next(
+            (m.get("content", "") for m in messages if m.get("role") == "system"), ""
+        )
+        contents = [
+            {"role": _GEMINI_ROLE[role], "parts": [{"text": msg.get("content", "")}]}
+            for msg in messages
+            if (role := msg.get("role", "user")) in _GEMINI_ROLE
+        ]
+        if system_text:
+            first_user = next((c for c in contents if c["role"] == "user"), None)
+            if first_user is not None:
+                part = first_user["parts"][0]
+                part["text"] = system_text + "\n\n" + part["text"]
 
         payload: dict[str, Any] = {
             "contents": contents,
@@ -258,41 +596,48 @@ class GeminiClient:
         if json_mode:
             payload["generationConfig"]["responseMimeType"] = "application/json"
 
-        url = f"/models/{self.model}:generateContent?key={self.api_key}"
-
         try:
-            resp = await http.post(url, json=payload)
+            async with self._sem:
+                resp = await http.post(
+                    self._url,
+                    content=orjson.dumps(payload),
+                    headers={
+                        **JSON_HEADERS,
+                        "Idempotency-Key": _idempotency_key(
+                            self.model, messages, temperature, max_tokens, json_mode
+                        ),
+                    },
+                    timeout=GEMINI_TIMEOUT_S,
+                )
 
             if resp.status_code == 429:
                 raise RateLimitError("Gemini rate limit exceeded")
 
             resp.raise_for_status()
-            data = resp.json()
+            data = orjson.loads(resp.content)
 
             # Extract text from response
             candidates = data.get("candidates", [])
             if not candidates:
                 raise ValueError("Gemini returned no candidates")
 
-            content = candidates[0].get("content", {}).get("parts", [{}])[0].get("text", "")
-            usage = data.get("usageMetadata", {})
+            parts = (candidates[0].get("content") or {}).get("parts") or [{}]
+            content = parts[0].get("text", "")
+            get_usage = (data.get("usageMetadata") or {}).get
+            total_tokens = get_usage("totalTokenCount", 0)
 
-            logger.info(
-                "Gemini response: model=%s tokens=%s",
-                self.model,
-                usage.get("totalTokenCount", "?"),
-            )
+            logger.info("Gemini response: model=%s tokens=%s", self.model, total_tokens)
 
             return LLMResponse(
                 content=content,
                 provider=LLMProvider.GEMINI,
                 model=self.model,
                 usage={
-                    "prompt_tokens": usage.get("promptTokenCount", 0),
-                    "completion_tokens": usage.get("candidatesTokenCount", 0),
-                    "total_tokens": usage.get("totalTokenCount", 0),
+                    "prompt_tokens": get_usage("promptTokenCount", 0),
+                    "completion_tokens": get_usage("candidatesTokenCount", 0),
+                    "total_tokens": total_tokens,
                 },
-                raw=data,
+                raw=data if include_raw else {},
             )
 
         except httpx.TimeoutException:
@@ -301,8 +646,8 @@ class GeminiClient:
             raise RuntimeError(f"Gemini HTTP error: {exc.response.status_code}") from exc
 
     async def close(self) -> None:
-        if self._http and not self._http.is_closed:
-            await self._http.aclose()
+        # The pooled client is shared; it is closed by close_shared_client()
+        pass
 
 
 # ---------------------------------------------------------------------------
@@ -316,15 +661,16 @@ class OllamaClient:
     def __init__(self, host: str | None = None, model: str | None = None) -> None:
         self.host = host or os.environ.get("OLLAMA_HOST", OLLAMA_DEFAULT_HOST)
         self.model = model or OLLAMA_DEFAULT_MODEL
-        self._http: httpx.AsyncClient | None = None
+        self._sem = asyncio.Semaphore(OLLAMA_MAX_INFLIGHT)
+        self._url = f"{self.host}/api/chat"
+        self._payload_template: dict[str, Any] = {
+            "model": self.model,
+            "messages": None,
+            "stream": False,
+        }
 
     async def _get_http(self) -> httpx.AsyncClient:
-        if self._http is None or self._http.is_closed:
-            self._http = httpx.AsyncClient(
-                base_url=self.host,
-                timeout=OLLAMA_TIMEOUT_S,
-            )
-        return self._http
+        return get_shared_client()
 
     async def chat(
         self,
@@ -332,30 +678,32 @@ class OllamaClient:
         temperature: float = 0.1,
         max_tokens: int = 2048,
         json_mode: bool = False,
+        include_raw: bool = False,
     ) -> LLMResponse:
         """Send a chat request to local Ollama."""
-        http = await self._get_http()
+        http = get_http_backend()
 
-        payload: dict[str, Any] = {
-            "model": self.model,
-            "messages": messages,
-            "stream": False,
-            "options": {
-                "temperature": temperature,
-                "num_predict": max_tokens,
-            },
-        }
+        payload = self._payload_template.copy()
+        payload["messages"] = messages
+        payload["options"] = {"temperature": temperature, "num_predict": max_tokens}
         if json_mode:
             payload["format"] = "json"
 
         try:
-            resp = await http.post("/api/chat", json=payload)
+            async with self._sem:
+                resp = await http.post(
+                    self._url,
+                    content=orjson.dumps(payload),
+                    headers=JSON_HEADERS,
+                    timeout=OLLAMA_TIMEOUT_S,
+                )
             resp.raise_for_status()
-            data = resp.json()
+            data = orjson.loads(resp.content)
 
-            content = data.get("message", {}).get("content", "")
-            eval_count = data.get("eval_count", 0)
-            prompt_count = data.get("prompt_eval_count", 0)
+            get = data.get
+            content = (get("message") or {}).get("content", "")
+            eval_count = get("eval_count", 0)
+            prompt_count = get("prompt_eval_count", 0)
 
             logger.info("Ollama response: model=%s tokens=%d", self.model, eval_count)
 
@@ -368,7 +716,7 @@ class OllamaClient:
                     "completion_tokens": eval_count,
                     "total_tokens": prompt_count + eval_count,
                 },
-                raw=data,
+                raw=data if include_raw else {},
             )
 
         except httpx.ConnectError:
@@ -377,15 +725,79 @@ class OllamaClient:
                 "Is Ollama running? Start it with: ollama serve"
             )
 
+    async def chat_stream(
+        self,
+        messages: list[dict[str, str]],
+        temperature: float = 0.1,
+        max_tokens: int = 2048,
+        json_mode: bool = False,
+    ) -> AsyncIterator[str]:
+        """Stream completion text from local Ollama as NDJSON chunks arrive."""
+        http = await self._get_http()
+
+        payload = self._payload_template.copy()
+        payload["messages"] = messages
+        payload["stream"] = True
+        payload["options"] = {"temperature": temperature, "num_predict": max_tokens}
+        if json_mode:
+            payload["format"] = "json"
+
+        try:
+            async with self._sem:
+                async with http.stream(
+                    "POST",
+                    self._url,
+                    content=orjson.dumps(payload),
+                    headers=JSON_HEADERS,
+                    timeout=OLLAMA_TIMEOUT_S,
+                ) as resp:
+                    resp.raise_for_status()
+                    async for line in resp.aiter_lines():
+                        if not line:
+                            continue
+                        chunk = orjson.loads(line)
+                        text = (chunk.get("message") or {}).get("content")
+                        if text:
+                            yield text
+                        if chunk.get("done"):
+                            break
+
+        except httpx.ConnectError:
+            raise ConnectionError(
+                f"Cannot connect to Ollama at {self.host}. "
+                "Is Ollama running? Start it with: ollama serve"
+            )
+
     async def close(self) -> None:
-        if self._http and not self._http.is_closed:
-            await self._http.aclose()
+        # The pooled client is shared; it is closed by close_shared_client()
+        pass
 
 
 # ---------------------------------------------------------------------------
 # Unified Client with auto-fallback
 # ---------------------------------------------------------------------------
 
+def _cache_key(
+    messages: list[dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    json_mode: bool,
+    include_raw: bool,
+) -> bytes:
+    """Hash a chat request into a compact response-cache key."""
+    body = orjson.dumps((messages, temperature, max_tokens, json_mode, include_raw))
+    return hashlib.blake2b(body, digest_size=16).digest()
+
+
+# Provider errors that mark a cloud provider as unavailable and trigger fallback
+_FALLBACK_ERRORS = (
+    RateLimitError,
+    httpx.HTTPStatusError,
+    httpx.TimeoutException,
+    ValueError,
+    RuntimeError,
+)
+
 
 class LLMClient:
     """
@@ -395,6 +807,22 @@ class LLMClient:
       1. Groq (fastest, cloud, requires GROQ_API_KEY)
       2. Gemini (reliable fallback, requires GEMINI_API_KEY)
       3. Ollama (local, no API key required, must be running)
+
+    Groq and Gemini are hedged: if Groq has not answered within
+    ``hedge_delay`` seconds, Gemini is started in parallel and the first
+    successful response wins. Pass ``hedge_delay=None`` for strict serial
+    fallback.
+
+    Low-temperature responses are kept in a bounded in-process LRU cache
+    keyed by the request, so identical prompts skip the network entirely.
+    Only answers from the primary provider are cached, so a fallback answer
+    given during a cooldown is not pinned after the primary recovers.
+
+    With ``batch=True``, requests are queued and a background coalescer
+    collects up to ``batch_max`` of them (or whatever arrives within
+    ``batch_window_ms``) and dispatches the round concurrently over the
+    shared HTTP/2 pool. None of the providers accept multiple prompts in
+    one call, so this amortizes scheduling, not requests.
     """
 
     def __init__(
@@ -405,18 +833,48 @@ class LLMClient:
         gemini_model: str | None = None,
         ollama_host: str | None = None,
         ollama_model: str | None = None,
+        hedge_delay: float | None = HEDGE_DELAY_S,
+        batch: bool = False,
+        batch_max: int = BATCH_MAX,
+        batch_window_ms: float = BATCH_WINDOW_MS,
     ) -> None:
         self.groq = GroqClient(api_key=groq_api_key, model=groq_model)
         self.gemini = GeminiClient(api_key=gemini_api_key, model=gemini_model)
         self.ollama = OllamaClient(host=ollama_host, model=ollama_model)
-        self._skip_groq = False
-        self._skip_gemini = False
+        self.hedge_delay = hedge_delay
+        # Monotonic deadline before which a failed provider is skipped
+        self._skip_until: dict[LLMProvider, float] = {
+            LLMProvider.GROQ: 0.0,
+            LLMProvider.GEMINI: 0.0,
+        }
+        self._fail_counts: dict[LLMProvider, int] = {
+            LLMProvider.GROQ: 0,
+            LLMProvider.GEMINI: 0,
+        }
+        self._cache: OrderedDict[bytes, LLMResponse] = OrderedDict()
+        self._cache_hits = 0
+        self._cache_misses = 0
+        # Deterministic requests currently on the wire, keyed like the cache
+        self._inflight: dict[bytes, asyncio.Task[LLMResponse]] = {}
+        self.batch = batch
+        self._batcher: RequestCoalescer[LLMResponse] = RequestCoalescer(
+            self._dispatch, batch_max, batch_window_ms / 1000, "LLM"
+        )
 
     @property
     def active_provider(self) -> LLMProvider:
-        if not self._skip_groq and self.groq.api_key:
+        if self.groq.api_key and not self._cooling_down(LLMProvider.GROQ):
             return LLMProvider.GROQ
-        if not self._skip_gemini and self.gemini.api_key:
+        if self.gemini.api_key and not self._cooling_down(LLMProvider.GEMINI):
+            return LLMProvider.GEMINI
+        return LLMProvider.OLLAMA
+
+    @property
+    def primary_provider(self) -> LLMProvider:
+        """The provider requests go to when nothing is cooling down."""
+        if self.groq.api_key:
+            return LLMProvider.GROQ
+        if self.gemini.api_key:
             return LLMProvider.GEMINI
         return LLMProvider.OLLAMA
 
@@ -426,46 +884,130 @@ class LLMClient:
         temperature: float = 0.1,
         max_tokens: int = 2048,
         json_mode: bool = False,
+        cache_bypass: bool = False,
+        include_raw: bool = False,
     ) -> LLMResponse:
         """
-        Send a chat request. Tries Groq → Gemini → Ollama in order.
+        Send a chat request. Races Groq and Gemini (hedged), then Ollama.
         Skips providers with missing API keys or persistent errors.
+
+        Deterministic requests (temperature <= CACHE_MAX_TEMPERATURE) are
+        served from the response cache unless ``cache_bypass`` is set, and
+        concurrent identical ones share a single provider call.
+
+        The decoded provider body is only kept on ``LLMResponse.raw`` when
+        ``include_raw`` is set; by default it is dropped to save memory.
         """
-        # 1. Try Groq
-        if not self._skip_groq and self.groq.api_key:
-            try:
-                result = await self.groq.chat(messages, temperature, max_tokens, json_mode)
-                logger.info("LLM served by Groq/%s", result.model)
-                return result
-            except RateLimitError:
-                logger.warning("Groq rate limited — falling back to Gemini")
-                self._skip_groq = True
-            except (httpx.HTTPStatusError, httpx.TimeoutException, ValueError, RuntimeError) as exc:
-                logger.warning("Groq unavailable (%s) — falling back to Gemini", exc)
-                self._skip_groq = True
+        cacheable = not cache_bypass and temperature <= CACHE_MAX_TEMPERATURE
+        if cacheable:
+            key = _cache_key(messages, temperature, max_tokens, json_mode, include_raw)
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self._cache_hits += 1
+                logger.debug("LLM response served from cache")
+                return cached
+            self._cache_misses += 1
+
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                logger.debug("Joining identical in-flight LLM request")
+                return await asyncio.shield(inflight)
+
+        args = (messages, temperature, max_tokens, json_mode, include_raw)
+        if self.batch:
+            request = self._batcher.submit(args)
         else:
-            if not self.groq.api_key:
-                logger.debug("Groq skipped: GROQ_API_KEY not set")
+            request = self._dispatch(*args)
 
-        # 2. Try Gemini
-        if not self._skip_gemini and self.gemini.api_key:
+        if not cacheable:
+            return await request
+
+        # Shielded so one caller cancelling doesn't fail the others sharing it
+        task = asyncio.create_task(request)
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._settle(key, t))
+        return await asyncio.shield(task)
+
+    async def chat_stream(
+        self,
+        messages: list[dict[str, str]],
+        temperature: float = 0.1,
+        max_tokens: int = 2048,
+        json_mode: bool = False,
+    ) -> AsyncIterator[str]:
+        """
+        Stream completion text as it is generated: Groq, else Ollama.
+
+        Streams are not hedged or cached. Fallback to Ollama only happens if
+        Groq fails before yielding its first chunk; a mid-stream failure is
+        raised to the caller.
+        """
+        if self.groq.api_key and not self._cooling_down(LLMProvider.GROQ):
+            started = False
             try:
-                result = await self.gemini.chat(messages, temperature, max_tokens, json_mode)
-                logger.info("LLM served by Gemini/%s", result.model)
-                return result
-            except RateLimitError:
-                logger.warning("Gemini rate limited — falling back to Ollama")
-                self._skip_gemini = True
-            except (httpx.HTTPStatusError, httpx.TimeoutException, ValueError, RuntimeError) as exc:
-                logger.warning("Gemini unavailable (%s) — falling back to Ollama", exc)
-                self._skip_gemini = True
-        else:
-            if not self.gemini.api_key:
-                logger.debug("Gemini skipped: GEMINI_API_KEY not set")
+                async for text in self.groq.chat_stream(
+                    messages, temperature, max_tokens, json_mode
+                ):
+                    started = True
+                    yield text
+                self._fail_counts[LLMProvider.GROQ] = 0
+                return
+            except _FALLBACK_ERRORS as exc:
+                if started:
+                    raise
+                self._mark_unavailable(LLMProvider.GROQ, exc)
+
+        async for text in self.ollama.chat_stream(messages, temperature, max_tokens, json_mode):
+            yield text
+
+    def _settle(self, key: bytes, task: asyncio.Task[LLMResponse]) -> None:
+        """Retire a finished in-flight request and cache its result."""
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        result = task.result()
+        if result.provider is not self.primary_provider:
+            return  # hedge/fallback answer; let the next call retry the primary
+        self._cache[key] = result
+        if len(self._cache) > RESPONSE_CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    def cache_stats(self) -> dict[str, int]:
+        """Return response cache counters for observability."""
+        return {
+            "hits": self._cache_hits,
+            "misses": self._cache_misses,
+            "size": len(self._cache),
+            "max_size": RESPONSE_CACHE_SIZE,
+        }
+
+    async def _dispatch(
+        self,
+        messages: list[dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        json_mode: bool,
+        include_raw: bool,
+    ) -> LLMResponse:
+        """Send the request through the provider fallback chain."""
+        if not self.groq.api_key:
+            logger.debug("Groq skipped: GROQ_API_KEY not set")
+        if not self.gemini.api_key:
+            logger.debug("Gemini skipped: GEMINI_API_KEY not set")
+
+        # 1 + 2. Groq, hedged with Gemini
+        result = await self._hedged_cloud_chat(
+            messages, temperature, max_tokens, json_mode, include_raw
+        )
+        if result is not None:
+            return result
 
         # 3. Try Ollama
         try:
-            result = await self.ollama.chat(messages, temperature, max_tokens, json_mode)
+            result = await self.ollama.chat(
+                messages, temperature, max_tokens, json_mode, include_raw
+            )
             logger.info("LLM served by Ollama/%s", result.model)
             return result
         except ConnectionError:
@@ -487,7 +1029,93 @@ class LLMClient:
             "No LLM available. Status:\n" + "\n".join(f"  • {a}" for a in available)
         )
 
+    async def _hedged_cloud_chat(
+        self,
+        messages: list[dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        json_mode: bool,
+        include_raw: bool,
+    ) -> LLMResponse | None:
+        """
+        Run Groq with a delayed Gemini hedge and return the first success.
+
+        Returns None when neither cloud provider is usable or both failed,
+        so the caller can fall through to Ollama.
+        """
+        args = (messages, temperature, max_tokens, json_mode, include_raw)
+        use_groq = bool(self.groq.api_key) and not self._cooling_down(LLMProvider.GROQ)
+        start_gemini = bool(self.gemini.api_key) and not self._cooling_down(LLMProvider.GEMINI)
+
+        loop = asyncio.get_running_loop()
+        hedge_at = loop.time() + self.hedge_delay if self.hedge_delay is not None else None
+
+        pending: dict[asyncio.Task[LLMResponse], LLMProvider] = {}
+        if use_groq:
+            pending[asyncio.create_task(self.groq.chat(*args))] = LLMProvider.GROQ
+
+        try:
+            while pending or start_gemini:
+                if start_gemini and (not pending or (hedge_at is not None and loop.time() >= hedge_at)):
+                    if pending:
+                        logger.info("Groq slower than %.2fs — hedging with Gemini", self.hedge_delay)
+                    pending[asyncio.create_task(self.gemini.chat(*args))] = LLMProvider.GEMINI
+                    start_gemini = False
+
+                timeout = None
+                if start_gemini and hedge_at is not None:
+                    timeout = max(0.0, hedge_at - loop.time())
+
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    provider = pending.pop(task)
+                    exc = task.exception()
+                    if exc is None:
+                        result = task.result()
+                        self._fail_counts[provider] = 0
+                        logger.info("LLM served by %s/%s", provider.value.capitalize(), result.model)
+                        return result
+                    self._mark_unavailable(provider, exc)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        return None
+
+    def _cooling_down(self, provider: LLMProvider) -> bool:
+        return time.monotonic() < self._skip_until[provider]
+
+    def _mark_unavailable(self, provider: LLMProvider, exc: BaseException) -> None:
+        """
+        Put a failed cloud provider into cooldown (60s, 120s, ... up to 300s
+        for consecutive failures). Re-raises errors that are not fallback-worthy.
+        """
+        if not isinstance(exc, _FALLBACK_ERRORS):
+            raise exc
+
+        self._fail_counts[provider] += 1
+        cooldown = min(
+            PROVIDER_MAX_COOLDOWN_S,
+            PROVIDER_COOLDOWN_S * 2 ** (self._fail_counts[provider] - 1),
+        )
+        self._skip_until[provider] = time.monotonic() + cooldown
+
+        name = provider.value.capitalize()
+        if isinstance(exc, RateLimitError):
+            logger.warning("%s rate limited — skipping for %.0fs", name, cooldown)
+        else:
+            logger.warning("%s unavailable (%s) — skipping for %.0fs", name, exc, cooldown)
+
+    async def __aenter__(self) -> LLMClient:
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.close()
+
     async def close(self) -> None:
+        await self._batcher.aclose()
         await self.groq.close()
         await self.gemini.close()
         await self.ollama.close()
@@ -12,14 +12,27 @@ needs_confirmation: true.
 
 from __future__ import annotations
 
-import json
+import asyncio
+import base64
+import hashlib
+import io
 import logging
+import re
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
+try:  # optional: keyframes are re-encoded as JPEG when Pillow is available
+    from PIL import Image
+except ImportError:  # pragma: no cover - depends on the environment
+    Image = None
 
 from ai.vlm_client import VLMClient
-from core.action_primitives import PRIMITIVE_REGISTRY
+from core.action_primitives import PRIMITIVE_REGISTRY, canonical_action_id
 
 logger = logging.getLogger("kinesys.procedure_extractor")
 
@@ -32,15 +45,36 @@ MIN_IMAGES = 2
 MAX_IMAGES = 12
 PROMPT_PATH = Path(__file__).parent / "prompts" / "teach_extract.txt"
 
+# Markdown code fence lines (```json ... ```) around the VLM's JSON output
+_FENCE_RE = re.compile(r"^```[^\n]*\n?|\n?```\s*$", re.MULTILINE)
+_JSON_OBJ_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+_PRIMITIVE_LIST_STR = ", ".join(sorted(PRIMITIVE_REGISTRY.keys()))  # for error messages
+
+# Keyframe preprocessing runs here so large base64 payloads don't block the
+# event loop (hashlib releases the GIL on large inputs)
+_PREPROC_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="kinesys-preproc")
+
+JPEG_QUALITY = 85
+_JPEG_B64_MAGIC = "/9j/"  # base64 of the JPEG SOI marker FF D8 FF
+
+PROCEDURE_CACHE_SIZE = 64
+PROCEDURE_CACHE_SIMILARITY = 0.5  # min keyframe overlap to reuse a past extraction
+
 
 # ---------------------------------------------------------------------------
 # Data structures
 # ---------------------------------------------------------------------------
 
 
-@dataclass
+@dataclass(slots=True)
 class ExtractedAction:
-    """A single action extracted from demonstration keyframes."""
+    """
+    A single action extracted from demonstration keyframes.
+
+    Field names match the wire format, so orjson can encode instances
+    directly; to_dict() is only needed for stdlib-json callers.
+    """
 
     step: int
     action: str
@@ -64,7 +98,7 @@ class ExtractedAction:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class ExtractionResult:
     """Result of procedural extraction from demonstration keyframes."""
 
@@ -92,13 +126,19 @@ class ExtractionResult:
 # ---------------------------------------------------------------------------
 
 
+_cached_prompt: Optional[str] = None
+
+
 def _load_system_prompt() -> str:
-    """Load the teach extraction system prompt from disk."""
-    try:
-        return PROMPT_PATH.read_text(encoding="utf-8")
-    except FileNotFoundError:
-        logger.error("Prompt file not found: %s", PROMPT_PATH)
-        raise RuntimeError(f"Missing prompt file: {PROMPT_PATH}")
+    """Load and cache the teach extraction system prompt."""
+    global _cached_prompt
+    if _cached_prompt is None:
+        try:
+            _cached_prompt = PROMPT_PATH.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            logger.error("Prompt file not found: %s", PROMPT_PATH)
+            raise RuntimeError(f"Missing prompt file: {PROMPT_PATH}")
+    return _cached_prompt
 
 
 # ---------------------------------------------------------------------------
@@ -112,7 +152,7 @@ def _validate_action(action_dict: Dict[str, Any]) -> ExtractedAction:
     primitive library. Returns an ExtractedAction with validation metadata.
     """
     step = action_dict.get("step", 0)
-    action_id = action_dict.get("action", "").upper()
+    action_id = canonical_action_id(action_dict.get("action", ""))
     params = action_dict.get("params", {})
     confidence = float(action_dict.get("confidence", 0.0))
     observation = action_dict.get("observation", "")
@@ -127,7 +167,7 @@ def _validate_action(action_dict: Dict[str, Any]) -> ExtractedAction:
     if not valid_primitive:
         validation_error = (
             f"Unknown primitive '{action_id}'. "
-            f"Available: {list(PRIMITIVE_REGISTRY.keys())}"
+            f"Available: {_PRIMITIVE_LIST_STR}"
         )
         logger.warning("Invalid primitive at step %d: %s", step, action_id)
 
@@ -151,32 +191,237 @@ def _parse_vlm_response(raw: str) -> Dict[str, Any]:
     Parse the VLM's JSON response. Handles markdown code fences and
     common formatting issues.
     """
-    text = raw.strip()
-
     # Strip markdown code fences if present
-    if text.startswith("```"):
-        lines = text.split("\n")
-        lines = [line for line in lines if not line.strip().startswith("```")]
-        text = "\n".join(lines).strip()
+    text = _FENCE_RE.sub("", raw).strip()
 
     # Try to extract JSON object
     try:
-        return json.loads(text)
-    except json.JSONDecodeError:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
         pass
 
-    # Try to find JSON object in the response
-    start = text.find("{")
-    end = text.rfind("}") + 1
-    if start >= 0 and end > start:
+    # Try to find JSON object in the response (first "{" to last "}")
+    match = _JSON_OBJ_RE.search(text)
+    if match:
         try:
-            return json.loads(text[start:end])
-        except json.JSONDecodeError:
+            return orjson.loads(match.group(0))
+        except orjson.JSONDecodeError:
             pass
 
     raise ValueError(f"Could not parse VLM response as JSON: {text[:500]}")
 
 
+def _parse_and_validate(
+    raw: str,
+    confidence_threshold: float,
+) -> Tuple[Dict[str, Any], List[ExtractedAction]]:
+    """
+    Parse the VLM response and validate its actions (CPU-bound, runs in a
+    worker thread). Raises ValueError if the response is unusable.
+    """
+    parsed = _parse_vlm_response(raw)
+
+    # Extract and validate actions
+    raw_actions = parsed.get("actions", [])
+    if not isinstance(raw_actions, list):
+        raise ValueError("VLM response 'actions' field is not a list")
+
+    validated_actions: List[ExtractedAction] = []
+    for i, action_dict in enumerate(raw_actions):
+        if not isinstance(action_dict, dict):
+            logger.warning("Skipping non-dict action at index %d", i)
+            continue
+
+        action = _validate_action(action_dict)
+
+        # Override threshold if custom value provided
+        if confidence_threshold != CONFIDENCE_THRESHOLD:
+            action.needs_confirmation = action.confidence < confidence_threshold
+
+        validated_actions.append(action)
+
+    # Filter out completely invalid actions (unknown primitives with
+    # very low confidence), but keep low-confidence valid primitives
+    # so the user can confirm them
+    kept_actions: List[ExtractedAction] = []
+    for action in validated_actions:
+        if not action.valid_primitive and action.confidence < 0.3:
+            logger.info(
+                "Dropping invalid low-confidence action: %s (%.2f)",
+                action.action, action.confidence,
+            )
+            continue
+        kept_actions.append(action)
+
+    return parsed, kept_actions
+
+
+# ---------------------------------------------------------------------------
+# Procedure cache (Cache-of-Thought)
+# ---------------------------------------------------------------------------
+
+
+def _frame_hashes(images: List[str]) -> Tuple[bytes, ...]:
+    """Content hash of each base64 keyframe."""
+    return tuple(hashlib.blake2b(img.encode(), digest_size=16).digest() for img in images)
+
+
+def _dedupe_frames(images: List[str]) -> Tuple[List[str], Tuple[bytes, ...]]:
+    """Drop frames identical to the one before; returns (frames, their hashes)."""
+    kept: List[str] = []
+    hashes: List[bytes] = []
+    for img, digest in zip(images, _frame_hashes(images)):
+        if not hashes or digest != hashes[-1]:
+            kept.append(img)
+            hashes.append(digest)
+    return kept, tuple(hashes)
+
+
+def _preprocess_images(images_base64: List[str]) -> Tuple[List[str], Tuple[bytes, ...]]:
+    """
+    Prepare keyframes for the VLM; returns (frames, their hashes).
+
+    Pure function of its argument so it can run on _PREPROC_EXECUTOR.
+    """
+    # Drop consecutive identical frames (pauses between actions) so they
+    # don't cost VLM image tokens, but never below the minimum frame count
+    images, frames = _dedupe_frames(images_base64)
+    if len(images) < MIN_IMAGES:
+        images, frames = list(images_base64), _frame_hashes(images_base64)
+    elif len(images) < len(images_base64):
+        logger.info(
+            "Dropped %d duplicate keyframes",
+            len(images_base64) - len(images),
+        )
+
+    # Limit number of images to avoid overloading the VLM
+    if len(images) > MAX_IMAGES:
+        logger.warning(
+            "Trimmed keyframe count from %d to %d",
+            len(images), MAX_IMAGES,
+        )
+        images, frames = images[:MAX_IMAGES], frames[:MAX_IMAGES]
+
+    return images, frames
+
+
+def _unique_frames(
+    images: List[str], frames: Tuple[bytes, ...]
+) -> Tuple[List[str], List[int]]:
+    """
+    Drop frames that recur anywhere in the sequence, keeping first occurrences.
+
+    Returns (images to send, 1-based image number for each frame in order).
+    Sends every frame if fewer than MIN_IMAGES distinct ones would remain.
+    """
+    index: Dict[bytes, int] = {}
+    order = [index.setdefault(digest, len(index) + 1) for digest in frames]
+    if len(index) == len(frames) or len(index) < MIN_IMAGES:
+        return list(images), list(range(1, len(images) + 1))
+
+    unique: List[str] = []
+    for img, number in zip(images, order):
+        if number > len(unique):  # first occurrence
+            unique.append(img)
+    return unique, order
+
+
+def _reencode_as_jpeg(image_b64: str) -> str:
+    """
+    Re-encode a base64 keyframe as JPEG (bare base64, no data: prefix).
+
+    Returns the input unchanged if it is already JPEG, can't be decoded,
+    or wouldn't get smaller.
+    """
+    data = image_b64.split(",", 1)[1] if image_b64.startswith("data:") else image_b64
+    if Image is None or data.startswith(_JPEG_B64_MAGIC):
+        return image_b64
+
+    try:
+        with Image.open(io.BytesIO(base64.b64decode(data))) as img:
+            out = io.BytesIO()
+            img.convert("RGB").save(out, "JPEG", quality=JPEG_QUALITY)
+    except (ValueError, OSError):  # bad base64 / not an image
+        return image_b64
+
+    encoded = base64.b64encode(out.getvalue()).decode("ascii")
+    return encoded if len(encoded) < len(data) else image_b64
+
+
+def _sequence_overlap(a: Tuple[bytes, ...], b: Tuple[bytes, ...]) -> float:
+    """Longest common subsequence of two frame sequences over the longer length."""
+    if not a or not b:
+        return 0.0
+    prev = [0] * (len(b) + 1)
+    for x in a:
+        row = [0]
+        for j, y in enumerate(b):
+            row.append(prev[j] + 1 if x == y else max(prev[j + 1], row[j]))
+        prev = row
+    return prev[-1] / max(len(a), len(b))
+
+
+class ProcedureCache:
+    """
+    Bounded LRU of past extractions, matched by keyframe overlap.
+
+    Each entry maps a demonstration's per-frame hashes to the raw VLM answer
+    for it:
+
+      - ``get`` — the same frames in the same order; the cached answer is
+        reused without calling the VLM at all
+      - ``lookup`` — the most similar entry at or above
+        ``similarity_threshold``, scored by the longest common subsequence
+        of frame hashes over the longer sequence. Order counts: the same
+        frames reversed (place-then-pick) score low. extract_procedure
+        routes near-duplicates to a cheaper apprentice VLM with the cached
+        answer as an in-context example
+
+    Answers are re-validated on every hit, so a different confidence
+    threshold still applies.
+    """
+
+    def __init__(
+        self,
+        max_size: int = PROCEDURE_CACHE_SIZE,
+        similarity_threshold: float = PROCEDURE_CACHE_SIMILARITY,
+    ) -> None:
+        self.max_size = max_size
+        self.similarity_threshold = similarity_threshold
+        self._entries: OrderedDict[Tuple[bytes, ...], str] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, frames: Tuple[bytes, ...]) -> Optional[str]:
+        """Return the cached raw answer for exactly these frames, or None."""
+        exact = self._entries.get(frames)
+        if exact is not None:
+            self._entries.move_to_end(frames)
+        return exact
+
+    def lookup(self, frames: Tuple[bytes, ...]) -> Tuple[Optional[str], float]:
+        """Return (cached raw answer, similarity) of the best match, or (None, 0.0)."""
+        # Linear scan: the cache is small, and an index would not beat it
+        best_key: Optional[Tuple[bytes, ...]] = None
+        best_score = 0.0
+        for key in self._entries:
+            score = _sequence_overlap(frames, key)
+            if score > best_score:
+                best_key, best_score = key, score
+
+        if best_key is None or best_score < self.similarity_threshold:
+            return None, 0.0
+        self._entries.move_to_end(best_key)
+        return self._entries[best_key], best_score
+
+    def insert(self, frames: Tuple[bytes, ...], raw_response: str) -> None:
+        self._entries[frames] = raw_response
+        self._entries.move_to_end(frames)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
 # ---------------------------------------------------------------------------
 # Main extractor
 # ---------------------------------------------------------------------------
@@ -186,6 +431,8 @@ async def extract_procedure(
     images_base64: List[str],
     vlm_client: Optional[VLMClient] = None,
     confidence_threshold: float = CONFIDENCE_THRESHOLD,
+    cache: Optional[ProcedureCache] = None,
+    apprentice_client: Optional[VLMClient] = None,
 ) -> ExtractionResult:
     """
     Extract a structured procedure from demonstration keyframe images.
@@ -194,6 +441,11 @@ async def extract_procedure(
         images_base64: List of base64-encoded keyframe images.
         vlm_client: Optional VLMClient instance. Creates one if not provided.
         confidence_threshold: Minimum confidence to auto-accept an action.
+        cache: Optional ProcedureCache of past extractions. Repeat
+            demonstrations skip the VLM; near-duplicates go to
+            ``apprentice_client`` (if given) with the cached answer as an
+            example.
+        apprentice_client: Optional smaller VLM for near-duplicate demos.
 
     Returns:
         ExtractionResult with validated action sequence.
@@ -211,13 +463,24 @@ async def extract_procedure(
             error=f"At least {MIN_IMAGES} keyframe images required, got {len(images_base64)}",
         )
 
-    # Limit number of images to avoid overloading the VLM
-    images = images_base64[:MAX_IMAGES]
-    if len(images_base64) > MAX_IMAGES:
-        logger.warning(
-            "Trimmed keyframe count from %d to %d",
-            len(images_base64), MAX_IMAGES,
-        )
+    # Hash/dedupe/trim the frames on the preprocessing pool, off the event loop
+    loop = asyncio.get_running_loop()
+    images, frames = await loop.run_in_executor(
+        _PREPROC_EXECUTOR, _preprocess_images, images_base64
+    )
+
+    # Frames that recur later in the demo (returning to a pose) are sent once
+    images, order = _unique_frames(images, frames)
+
+    # Re-encode as JPEG in parallel (Pillow releases the GIL while coding)
+    if Image is not None:
+        encoded = await asyncio.gather(*(
+            loop.run_in_executor(_PREPROC_EXECUTOR, _reencode_as_jpeg, img) for img in images
+        ))
+        saved = sum(map(len, images)) - sum(map(len, encoded))
+        if saved > 0:
+            logger.info("JPEG re-encode saved %d KB of keyframe data", saved // 1024)
+        images = list(encoded)
 
     # Load prompt
     try:
@@ -225,13 +488,29 @@ async def extract_procedure(
     except RuntimeError as exc:
         return ExtractionResult(success=False, error=str(exc))
 
-    # Build user prompt with frame count context
-    user_prompt = (
-        f"I am showing you {len(images)} keyframe images from a webcam demonstration "
-        f"of a robotic manipulation task. The images are in temporal order "
-        f"(frame 1 is earliest, frame {len(images)} is latest). "
-        f"Analyze the visual changes between consecutive frames and extract "
-        f"the procedural steps as specified in your instructions."
+    # Build user prompt with frame count context, numbering the images sent
+    if len(images) == len(order):
+        user_prompt = (
+            f"I am showing you {len(images)} keyframe images from a webcam demonstration "
+            f"of a robotic manipulation task. The images are in temporal order "
+            f"(frame 1 is earliest, frame {len(images)} is latest). "
+            f"Analyze the visual changes between consecutive frames and extract "
+            f"the procedural steps as specified in your instructions."
+        )
+    else:
+        user_prompt = (
+            f"I am showing you {len(images)} distinct keyframe images from a webcam "
+            f"demonstration of a robotic manipulation task. The demonstration has "
+            f"{len(order)} frames; some recur, so each distinct image is sent once. "
+            f"As image numbers, the frames in temporal order (earliest first) are: "
+            f"{', '.join(map(str, order))}. "
+            f"Analyze the visual changes between consecutive frames and extract "
+            f"the procedural steps as specified in your instructions."
+        )
+
+    exact = cache.get(frames) if cache is not None else None
+    cached, similarity = (
+        cache.lookup(frames) if cache is not None and exact is None else (None, 0.0)
     )
 
     # Create client if needed
@@ -240,78 +519,67 @@ async def extract_procedure(
         vlm_client = VLMClient()
 
     try:
-        response = await vlm_client.analyze_images(
-            images_base64=images,
-            system_prompt=system_prompt,
-            user_prompt=user_prompt,
-            temperature=0.1,
-            max_tokens=4096,
-            json_mode=True,
-        )
+        if exact is not None:
+            logger.info("Procedure cache hit — reusing previous extraction")
+            content = exact
+        else:
+            client = vlm_client
+            if cached is not None and apprentice_client is not None:
+                logger.info(
+                    "Similar demonstration cached (overlap %.2f) — using apprentice VLM",
+                    similarity,
+                )
+                client = apprentice_client
+                user_prompt += (
+                    "\n\nA similar demonstration was previously analyzed as follows. "
+                    "Use it as a reference, but describe what these frames show:\n"
+                    + cached
+                )
 
-        if not response.success:
-            return ExtractionResult(
-                success=False,
-                error=response.error or "VLM returned empty response",
-                raw_response=response.content,
+            response = await client.analyze_images(
+                images_base64=images,
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                temperature=0.1,
+                max_tokens=4096,
+                json_mode=True,
             )
 
-        # Parse JSON response
+            if not response.success:
+                return ExtractionResult(
+                    success=False,
+                    error=response.error or "VLM returned empty response",
+                    raw_response=response.content,
+                )
+            content = response.content
+
+        # Parse + validate off the event loop; 4k-token VLM responses
+        # would otherwise stall other WebSocket clients
         try:
-            parsed = _parse_vlm_response(response.content)
+            parsed, kept_actions = await asyncio.to_thread(
+                _parse_and_validate, content, confidence_threshold
+            )
         except ValueError as exc:
             return ExtractionResult(
                 success=False,
                 error=str(exc),
-                raw_response=response.content,
-            )
-
-        # Extract and validate actions
-        raw_actions = parsed.get("actions", [])
-        if not isinstance(raw_actions, list):
-            return ExtractionResult(
-                success=False,
-                error="VLM response 'actions' field is not a list",
-                raw_response=response.content,
+                raw_response=content,
             )
 
-        validated_actions: List[ExtractedAction] = []
-        for i, action_dict in enumerate(raw_actions):
-            if not isinstance(action_dict, dict):
-                logger.warning("Skipping non-dict action at index %d", i)
-                continue
-
-            action = _validate_action(action_dict)
-
-            # Override threshold if custom value provided
-            if confidence_threshold != CONFIDENCE_THRESHOLD:
-                action.needs_confirmation = action.confidence < confidence_threshold
-
-            validated_actions.append(action)
-
-        # Filter out completely invalid actions (unknown primitives with
-        # very low confidence), but keep low-confidence valid primitives
-        # so the user can confirm them
-        kept_actions: List[ExtractedAction] = []
-        for action in validated_actions:
-            if not action.valid_primitive and action.confidence < 0.3:
-                logger.info(
-                    "Dropping invalid low-confidence action: %s (%.2f)",
-                    action.action, action.confidence,
-                )
-                continue
-            kept_actions.append(action)
+        if cache is not None:
+            cache.insert(frames, content)
 
         summary = parsed.get("summary", "")
         objects_detected = parsed.get("objects_detected", [])
-        frame_count = parsed.get("frame_count", len(images))
-
-        logger.info(
-            "Extraction complete: %d actions (%d need confirmation), summary: %s",
-            len(kept_actions),
-            sum(1 for a in kept_actions if a.needs_confirmation),
-            summary,
-        )
+        frame_count = parsed.get("frame_count", len(order))
+
+        if logger.isEnabledFor(logging.INFO):  # skip the count when INFO is off
+            logger.info(
+                "Extraction complete: %d actions (%d need confirmation), summary: %s",
+                len(kept_actions),
+                sum(1 for a in kept_actions if a.needs_confirmation),
+                summary,
+            )
 
         return ExtractionResult(
             success=True,
@@ -319,7 +587,7 @@ async def extract_procedure(
             summary=summary,
             objects_detected=objects_detected,
             frame_count=frame_count,
-            raw_response=response.content,
+            raw_response=content,
         )
 
     except Exception as exc:
@@ -13,10 +13,20 @@ The scene graph provides:
 
 from __future__ import annotations
 
+import hashlib
 import math
+from collections import OrderedDict, defaultdict
 from dataclasses import dataclass, field
 from typing import Any
 
+import numpy as np
+import orjson
+
+try:  # optional speed-up for the pairwise relation kernel
+    import numba
+except ImportError:  # pragma: no cover - depends on the environment
+    numba = None
+
 from core.action_primitives import SceneObject, SceneState
 
 # ---------------------------------------------------------------------------
@@ -26,6 +36,23 @@ from core.action_primitives import SceneObject, SceneState
 NEAR_THRESHOLD = 0.3  # meters
 ON_TOP_THRESHOLD = 0.15  # vertical proximity for "on top of"
 HORIZONTAL_THRESHOLD = 0.1  # horizontal proximity for "on top of"
+SPATIAL_INDEX_MIN_OBJECTS = 10  # below this, the all-pairs pass is cheaper
+
+SCENE_CACHE_SIZE = 16  # distinct scenes whose graphs are kept
+_scene_cache: dict[bytes, SceneGraph] = {}
+
+DESCRIPTION_CACHE_SIZE = 32  # distinct scenes whose descriptions are kept
+_description_cache: OrderedDict[bytes, str] = OrderedDict()
+
+# Relation names by axis code (code 0 = no relation on that axis)
+_PROXIMITY = ("", "on_top_of", "near")
+_LATERAL = ("", "left_of", "right_of")
+_DEPTH = ("", "in_front_of", "behind")
+
+# Natural-language form of each relation name ("on_top_of" -> "on top of")
+_RELATION_PHRASES = {
+    name: name.replace("_", " ") for name in (*_PROXIMITY[1:], *_LATERAL[1:], *_DEPTH[1:])
+}
 
 
 @dataclass
@@ -37,12 +64,20 @@ class SpatialRelation:
     object: str
 
     def to_natural_language(self) -> str:
-        return f"{self.subject} is {self.relation.replace('_', ' ')} {self.object}"
+        phrase = _RELATION_PHRASES.get(self.relation) or self.relation.replace("_", " ")
+        return f"{self.subject} is {phrase} {self.object}"
 
 
 @dataclass
 class SceneGraph:
-    """Complete scene graph with objects and spatial relationships."""
+    """
+    Complete scene graph with objects and spatial relationships.
+
+    Alongside the ``objects`` list, object ids and positions are kept as
+    parallel arrays (``ids``, ``positions`` of shape (N, 3)) for numeric
+    consumers such as compute_spatial_relations; built from ``objects``
+    when not supplied.
+    """
 
     objects: list[SceneObject]
     relations: list[SpatialRelation]
@@ -50,26 +85,38 @@ class SceneGraph:
     end_effector: tuple[float, float, float]
     gripper_open: bool
     held_object_id: str | None
+    ids: list[str] = field(default_factory=list, repr=False, compare=False)
+    positions: np.ndarray | None = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        if self.positions is None:
+            self.ids, self.positions = _object_arrays(self.objects)
 
     def to_description(self) -> str:
         """Generate a natural language scene description for the LLM prompt."""
-        lines: list[str] = []
+        lines: list[str] = ["## Objects on the table:"]
+        append = lines.append
 
-        lines.append("## Objects on the table:")
         for obj in self.objects:
             pos = obj.position
-            size_str = " x ".join(f"{s:.2f}" for s in obj.size)
+            size_str = " x ".join([f"{s:.2f}" for s in obj.size])
             held = " [CURRENTLY HELD BY ROBOT]" if obj.is_held else ""
-            lines.append(
+            append(
                 f"- {obj.id}: {obj.color} {obj.shape}, "
                 f"position=({pos[0]:.2f}, {pos[1]:.2f}, {pos[2]:.2f}), "
                 f"size=({size_str}){held}"
             )
 
         if self.relations:
-            lines.append("\n## Spatial relationships:")
-            for rel in self.relations:
-                lines.append(f"- {rel.to_natural_language()}")
+            append("\n## Spatial relationships:")
+            # Relations dominate on busy scenes: one f-string each, no per-item replace()
+            phrases = _RELATION_PHRASES
+            lines.extend([
+                f"- {rel.subject} is {phrases[rel.relation]} {rel.object}"
+                if rel.relation in phrases
+                else f"- {rel.to_natural_language()}"
+                for rel in self.relations
+            ])
 
         lines.append(f"\n## Robot state:")
         lines.append(
@@ -115,59 +162,335 @@ class SceneGraph:
 # ---------------------------------------------------------------------------
 
 
-def compute_spatial_relations(objects: list[SceneObject]) -> list[SpatialRelation]:
-    """Compute pairwise spatial relationships between scene objects."""
-    relations: list[SpatialRelation] = []
+def _relations_kernel(
+    pos: np.ndarray, id_rank: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pairwise relation codes for an (N, 3) position array.
 
-    for i, a in enumerate(objects):
-        for j, b in enumerate(objects):
+    Returns (i, j, proximity, lateral, depth) arrays, one entry per related
+    pair in row-major order; codes index into _PROXIMITY/_LATERAL/_DEPTH.
+    ``id_rank`` orders object ids so "near" is only emitted once per pair.
+    JIT-compiled with Numba when it is installed.
+    """
+    n = pos.shape[0]
+    out = np.empty((n * (n - 1), 5), dtype=np.int64)
+    count = 0
+    for i in range(n):
+        for j in range(n):
             if i == j:
                 continue
+            dx = pos[i, 0] - pos[j, 0]
+            dy = pos[i, 1] - pos[j, 1]
+            dz = pos[i, 2] - pos[j, 2]
 
-            dx = a.position[0] - b.position[0]
-            dy = a.position[1] - b.position[1]
-            dz = a.position[2] - b.position[2]
-            horiz_dist = math.sqrt(dx * dx + dz * dz)
-            dist_3d = math.sqrt(dx * dx + dy * dy + dz * dz)
-
-            # On top of
-            if dy > ON_TOP_THRESHOLD * 0.5 and horiz_dist < HORIZONTAL_THRESHOLD:
-                relations.append(SpatialRelation(a.id, "on_top_of", b.id))
-
-            # Near
-            elif dist_3d < NEAR_THRESHOLD:
-                # Avoid duplicate "near" — only add if a.id < b.id
-                if a.id < b.id:
-                    relations.append(SpatialRelation(a.id, "near", b.id))
-
-            # Left / right (x-axis)
-            if dx < -NEAR_THRESHOLD:
-                relations.append(SpatialRelation(a.id, "left_of", b.id))
-            elif dx > NEAR_THRESHOLD:
-                relations.append(SpatialRelation(a.id, "right_of", b.id))
-
-            # In front / behind (z-axis)
-            if dz < -NEAR_THRESHOLD:
-                relations.append(SpatialRelation(a.id, "in_front_of", b.id))
-            elif dz > NEAR_THRESHOLD:
-                relations.append(SpatialRelation(a.id, "behind", b.id))
+            prox = 0
+            if dy > ON_TOP_THRESHOLD * 0.5 and math.sqrt(dx * dx + dz * dz) < HORIZONTAL_THRESHOLD:
+                prox = 1
+            elif math.sqrt(dx * dx + dy * dy + dz * dz) < NEAR_THRESHOLD and id_rank[i] < id_rank[j]:
+                prox = 2
+
+            lat = 1 if dx < -NEAR_THRESHOLD else (2 if dx > NEAR_THRESHOLD else 0)
+            dep = 1 if dz < -NEAR_THRESHOLD else (2 if dz > NEAR_THRESHOLD else 0)
+
+            if prox or lat or dep:
+                out[count, 0] = i
+                out[count, 1] = j
+                out[count, 2] = prox
+                out[count, 3] = lat
+                out[count, 4] = dep
+                count += 1
+    rows = out[:count]
+    return rows[:, 0], rows[:, 1], rows[:, 2], rows[:, 3], rows[:, 4]
+
+
+if numba is not None:
+    _relations_kernel = numba.njit(cache=True)(_relations_kernel)
+
+
+def warm_relations_kernel() -> None:
+    """
+    Compile the Numba relation kernel now rather than on first use.
+
+    Compilation (or loading the on-disk cache) takes long enough to stall
+    the event loop if it happens inside the first describe_scene(); call
+    this from a worker thread at startup. No-op without Numba.
+    """
+    if numba is not None:
+        _relations_kernel(np.zeros((2, 3)), np.arange(2, dtype=np.int64))
+
+
+def _relations_numpy(
+    pos: np.ndarray, id_rank: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Broadcast equivalent of _relations_kernel, used when Numba is unavailable."""
+    n = pos.shape[0]
+    diff = pos[:, None, :] - pos[None, :, :]
+    dx, dy, dz = diff[..., 0], diff[..., 1], diff[..., 2]
+    horiz_dist = np.sqrt(dx * dx + dz * dz)
+    dist_3d = np.sqrt(dx * dx + dy * dy + dz * dz)
+    off_diag = ~np.eye(n, dtype=bool)
+
+    on_top = (dy > ON_TOP_THRESHOLD * 0.5) & (horiz_dist < HORIZONTAL_THRESHOLD) & off_diag
+    # Avoid duplicate "near" — only keep the pair where a.id < b.id
+    near = ~on_top & (dist_3d < NEAR_THRESHOLD) & (id_rank[:, None] < id_rank[None, :])
+
+    # Per pair, at most one relation per axis: 0 = none, else index into the names
+    proximity = np.where(on_top, 1, np.where(near, 2, 0))
+    lateral = np.where(dx < -NEAR_THRESHOLD, 1, np.where(dx > NEAR_THRESHOLD, 2, 0))
+    depth = np.where(dz < -NEAR_THRESHOLD, 1, np.where(dz > NEAR_THRESHOLD, 2, 0))
+
+    i_idx, j_idx = np.nonzero(proximity | lateral | depth)
+    return (
+        i_idx,
+        j_idx,
+        proximity[i_idx, j_idx],
+        lateral[i_idx, j_idx],
+        depth[i_idx, j_idx],
+    )
+
+
+def _directional_neighbors(
+    coord: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Nearest objects beyond NEAR_THRESHOLD on each side along one axis.
+
+    Returns (lo_i, lo_j, hi_i, hi_j): pairs where j lies beyond i on the
+    smaller (lo) or larger (hi) side, but not beyond i's nearest such
+    object k. That covers every object tied with k, and every object that
+    k itself does not relate to. Chaining these pairs therefore
+    reproduces every directional pair of the all-pairs path.
+    """
+    n = coord.shape[0]
+    order = np.argsort(coord, kind="stable")
+    sorted_coord = coord[order]
+
+    # Pairwise differences are monotone in the sorted coordinate, so the
+    # first sorted position beyond ``base`` is where this predicate flips;
+    # the searchsorted guess (base ± threshold) can be off by rounding
+    def first_beyond(base: np.ndarray, sign: int) -> np.ndarray:
+        def beyond(k: np.ndarray) -> np.ndarray:
+            valid = (k >= 0) & (k < n)
+            return valid & (sign * (sorted_coord[np.clip(k, 0, n - 1)] - base) > NEAR_THRESHOLD)
+
+        if sign > 0:
+            k = np.searchsorted(sorted_coord, base + NEAR_THRESHOLD, side="right")
+        else:
+            k = np.searchsorted(sorted_coord, base - NEAR_THRESHOLD, side="left") - 1
+        while (back := beyond(k - sign)).any():
+            k[back] -= sign
+        while (fwd := (k >= 0) & (k < n) & ~beyond(k)).any():
+            k[fwd] += sign
+        return k
+
+    def window(
+        subjects: np.ndarray, start: np.ndarray, stop: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        # Pair each subject with every sorted position in its [start, stop)
+        counts = stop - start
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return np.repeat(subjects, counts), order[np.repeat(start, counts) + offsets]
+
+    idx = np.arange(n)
+    hi = first_beyond(coord, 1)
+    lo = first_beyond(coord, -1)
+    has_hi = hi < n
+    has_lo = lo >= 0
+    hi, lo = hi[has_hi], lo[has_lo]
+    hi_i, hi_j = window(idx[has_hi], hi, first_beyond(sorted_coord[hi], 1))
+    lo_i, lo_j = window(idx[has_lo], first_beyond(sorted_coord[lo], -1) + 1, lo + 1)
+    return lo_i, lo_j, hi_i, hi_j
+
+
+def _relations_indexed(
+    pos: np.ndarray, id_rank: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Sub-quadratic relation codes for larger scenes.
+
+    "on_top_of"/"near" are exact: a uniform grid with NEAR_THRESHOLD cells
+    on the x/z plane limits distance checks to objects in neighbouring
+    cells. Directional relations are reduced to each object's nearest
+    qualifying neighbours per side and axis (see _directional_neighbors).
+    The full set follows by chaining them, and listing all O(N²) pairs
+    would swamp the prompt.
+    Same return layout as _relations_kernel.
+    """
+    n = pos.shape[0]
+    cells = np.floor(pos[:, [0, 2]] / NEAR_THRESHOLD).astype(np.int64).tolist()
+    grid: defaultdict[tuple[int, int], list[int]] = defaultdict(list)
+    for idx, (cx, cz) in enumerate(cells):
+        grid[(cx, cz)].append(idx)
+
+    cand_i: list[int] = []
+    cand_j: list[int] = []
+    for idx, (cx, cz) in enumerate(cells):
+        for ox in (-1, 0, 1):
+            for oz in (-1, 0, 1):
+                for j in grid.get((cx + ox, cz + oz), ()):
+                    if j != idx:
+                        cand_i.append(idx)
+                        cand_j.append(j)
+
+    ci = np.array(cand_i, dtype=np.int64)
+    cj = np.array(cand_j, dtype=np.int64)
+    diff = pos[ci] - pos[cj]
+    dx, dy, dz = diff[:, 0], diff[:, 1], diff[:, 2]
+    on_top = (dy > ON_TOP_THRESHOLD * 0.5) & (np.sqrt(dx * dx + dz * dz) < HORIZONTAL_THRESHOLD)
+    near = ~on_top & (np.sqrt(dx * dx + dy * dy + dz * dz) < NEAR_THRESHOLD) & (
+        id_rank[ci] < id_rank[cj]
+    )
+    proximity = np.where(on_top, 1, np.where(near, 2, 0))
+    keep = proximity > 0
+
+    # (i, j, column, code) for every relation; column 0/1/2 = proximity/lateral/depth
+    parts_i = [ci[keep]]
+    parts_j = [cj[keep]]
+    parts_col = [np.zeros(int(keep.sum()), dtype=np.int64)]
+    parts_code = [proximity[keep]]
+    for col, axis in ((1, 0), (2, 2)):
+        lo_i, lo_j, hi_i, hi_j = _directional_neighbors(pos[:, axis])
+        # i "left_of"/"in_front_of" j when j is larger; code 2 when j is smaller
+        for rel_i, rel_j, code in ((hi_i, hi_j, 1), (lo_i, lo_j, 2)):
+            parts_i.append(rel_i)
+            parts_j.append(rel_j)
+            parts_col.append(np.full(rel_i.shape[0], col, dtype=np.int64))
+            parts_code.append(np.full(rel_i.shape[0], code, dtype=np.int64))
+
+    # Merge per pair, in row-major (i, j) order like the all-pairs path
+    keys, inverse = np.unique(np.concatenate(parts_i) * n + np.concatenate(parts_j), return_inverse=True)
+    codes = np.zeros((keys.shape[0], 3), dtype=np.int64)
+    codes[inverse, np.concatenate(parts_col)] = np.concatenate(parts_code)
+    return keys // n, keys % n, codes[:, 0], codes[:, 1], codes[:, 2]
+
+
+def _object_arrays(objects: list[SceneObject]) -> tuple[list[str], np.ndarray]:
+    """Struct-of-arrays view of objects: (ids, (N, 3) float64 positions)."""
+    ids = [o.id for o in objects]
+    positions = np.array([o.position for o in objects], dtype=np.float64).reshape(len(ids), 3)
+    return ids, positions
+
+
+def compute_spatial_relations(
+    objects: list[SceneObject],
+    positions: np.ndarray | None = None,
+) -> list[SpatialRelation]:
+    """
+    Compute pairwise spatial relationships between scene objects.
+
+    The numeric work runs in a Numba-compiled loop when Numba is installed,
+    otherwise with NumPy broadcasting; Python only touches the pairs that
+    actually relate. Output order matches a row-major walk of
+    (subject, object) pairs. Pass ``positions`` (as held by SceneGraph) to
+    skip rebuilding the array.
+
+    Scenes with SPATIAL_INDEX_MIN_OBJECTS or more objects use a spatial
+    index instead (see _relations_indexed): proximity relations are
+    unchanged, directional ones are limited to nearest neighbours.
+    """
+    n = len(objects)
+    if n < 2:
+        return []
+
+    if positions is None:
+        ids, pos = _object_arrays(objects)
+    else:
+        ids, pos = [o.id for o in objects], positions
+    # Rank of each id in sorted order, so id comparisons become int comparisons
+    _, id_rank = np.unique(np.array(ids), return_inverse=True)
+
+    if n >= SPATIAL_INDEX_MIN_OBJECTS:
+        compute = _relations_indexed
+    elif numba is not None:
+        compute = _relations_kernel
+    else:
+        compute = _relations_numpy
+    rows = zip(*(col.tolist() for col in compute(pos, id_rank.astype(np.int64))))
+
+    relations: list[SpatialRelation] = []
+    for i, j, prox, lat, dep in rows:
+        a, b = ids[i], ids[j]
+        if prox:
+            relations.append(SpatialRelation(a, _PROXIMITY[prox], b))
+        if lat:
+            relations.append(SpatialRelation(a, _LATERAL[lat], b))
+        if dep:
+            relations.append(SpatialRelation(a, _DEPTH[dep], b))
 
     return relations
 
 
 def analyze_scene(scene: SceneState) -> SceneGraph:
-    """Build a complete scene graph from the current scene state."""
-    objects = list(scene.objects.values())
-    relations = compute_spatial_relations(objects)
+    """
+    Build a complete scene graph from the current scene state.
+
+    Objects are ordered by id so the graph (and its description) does not
+    depend on the order the frontend listed them in.
+
+    Graphs are memoized by scene content, so re-sent unchanged scenes and
+    decomposition retries skip the relation computation. The returned graph
+    may be shared between callers and must be treated as read-only.
+    """
+    key = _scene_key(scene)
+    graph = _scene_cache.get(key)
+    if graph is not None:
+        return graph
+
+    objects = sorted(scene.objects.values(), key=lambda o: o.id)
+    ids, positions = _object_arrays(objects)
 
-    return SceneGraph(
+    graph = SceneGraph(
         objects=objects,
-        relations=relations,
+        relations=compute_spatial_relations(objects, positions),
         table_height=scene.table_height,
         end_effector=scene.end_effector,
         gripper_open=scene.gripper_open,
         held_object_id=scene.held_object_id,
+        ids=ids,
+        positions=positions,
+    )
+    _scene_cache[key] = graph
+    if len(_scene_cache) > SCENE_CACHE_SIZE:
+        del _scene_cache[next(iter(_scene_cache))]  # FIFO eviction
+    return graph
+
+
+def _scene_key(scene: SceneState) -> bytes:
+    """Hash the scene content (object order does not matter)."""
+    canonical = (
+        [
+            (o.id, o.shape, o.color, o.position, o.size, o.mass, o.is_held)
+            for o in sorted(scene.objects.values(), key=lambda o: o.id)
+        ],
+        scene.end_effector,
+        scene.gripper_open,
+        scene.held_object_id,
+        scene.table_height,
     )
+    return hashlib.blake2b(orjson.dumps(canonical), digest_size=16).digest()
+
+
+def describe_scene(scene: SceneState) -> str:
+    """
+    Natural language description of a scene for the LLM prompt, cached by
+    scene content.
+
+    Repeated commands against an unchanged scene reuse the exact same
+    string (keeping the provider's prompt-cache prefix intact) and skip
+    the pairwise relation computation entirely.
+    """
+    key = _scene_key(scene)
+    description = _description_cache.get(key)
+    if description is not None:
+        _description_cache.move_to_end(key)
+        return description
+
+    description = analyze_scene(scene).to_description()
+    _description_cache[key] = description
+    if len(_description_cache) > DESCRIPTION_CACHE_SIZE:
+        _description_cache.popitem(last=False)
+    return description
 
 
 def scene_state_from_frontend(data: dict[str, Any]) -> SceneState:
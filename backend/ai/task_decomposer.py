@@ -8,15 +8,15 @@ validated list of Action dicts matching the primitive schema.
 
 from __future__ import annotations
 
-import json
+import asyncio
 import logging
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 
 from ai.llm_client import LLMClient, LLMResponse, LLMProvider
-from ai.scene_analyzer import SceneGraph, analyze_scene
-from core.action_primitives import SceneState, PRIMITIVE_REGISTRY
+from ai.scene_analyzer import describe_scene
+from core.action_primitives import SceneState, PRIMITIVE_REGISTRY, canonical_action_id
 
 logger = logging.getLogger("kinesys.decomposer")
 
@@ -43,10 +43,11 @@ def _load_decompose_prompt() -> str:
 # Types
 # ---------------------------------------------------------------------------
 
-VALID_ACTIONS = set(PRIMITIVE_REGISTRY.keys())
+VALID_ACTIONS = frozenset(PRIMITIVE_REGISTRY.keys())
+_PRIMITIVES_SORTED = sorted(VALID_ACTIONS)  # for error messages
 
 
-@dataclass
+@dataclass(slots=True)
 class DecompositionResult:
     """Result of decomposing a natural language command into actions."""
 
@@ -97,12 +98,12 @@ def _validate_actions(
         if not isinstance(action, dict):
             return False, [], f"Action {i} is not a dict: {action}"
 
-        action_type = action.get("action", "").upper()
+        action_type = canonical_action_id(action.get("action", ""))
 
         if action_type not in VALID_ACTIONS:
             return False, [], (
                 f"Action {i}: unknown primitive '{action_type}'. "
-                f"Allowed: {sorted(VALID_ACTIONS)}"
+                f"Allowed: {_PRIMITIVES_SORTED}"
             )
 
         params = action.get("params", {})
@@ -139,6 +140,23 @@ def _validate_actions(
     return True, cleaned, None
 
 
+def _parse_and_validate(
+    response: LLMResponse,
+    scene: SceneState,
+) -> tuple[bool, list[dict[str, Any]], str | None]:
+    """
+    Parse the LLM response and validate its actions (CPU-bound, runs in a
+    worker thread). Raises ValueError if the response is not valid JSON.
+    """
+    parsed = response.parse_json()
+
+    # Handle case where LLM wraps in {"actions": [...]}
+    if isinstance(parsed, dict) and "actions" in parsed:
+        parsed = parsed["actions"]
+
+    return _validate_actions(parsed, scene)
+
+
 # ---------------------------------------------------------------------------
 # Main decomposer
 # ---------------------------------------------------------------------------
@@ -150,6 +168,7 @@ async def decompose_command(
     llm_client: LLMClient | None = None,
     temperature: float = 0.1,
     max_tokens: int = 2048,
+    scene_description: str | None = None,
 ) -> DecompositionResult:
     """
     Decompose a natural language command into a sequence of robot actions.
@@ -160,24 +179,25 @@ async def decompose_command(
         llm_client: LLM client instance (creates one if None)
         temperature: LLM sampling temperature
         max_tokens: Max response tokens
+        scene_description: Precomputed describe_scene(scene), if available
 
     Returns:
         DecompositionResult with validated action sequence
     """
     # Build the prompt
-    scene_graph: SceneGraph = analyze_scene(scene)
-    scene_description = scene_graph.to_description()
-
-    prompt_template = _load_decompose_prompt()
-    system_prompt = prompt_template.replace(
-        "{scene_description}", scene_description
-    ).replace(
-        "{user_command}", command
-    )
-
+    # The system prompt is fully static so providers can cache its prefix;
+    # everything that changes per call goes in the user message
+    if scene_description is None:
+        scene_description = describe_scene(scene)
     messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": command},
+        {"role": "system", "content": _load_decompose_prompt()},
+        {
+            "role": "user",
+            "content": (
+                f"## SCENE STATE\n{scene_description}\n\n"
+                f"## USER COMMAND\n{command}"
+            ),
+        },
     ]
 
     # Call LLM
@@ -206,9 +226,12 @@ async def decompose_command(
         if own_client and llm_client:
             await llm_client.close()
 
-    # Parse JSON from response
+    # Parse + validate off the event loop; large responses would otherwise
+    # stall other WebSocket clients
     try:
-        parsed = response.parse_json()
+        is_valid, actions, error = await asyncio.to_thread(
+            _parse_and_validate, response, scene
+        )
     except ValueError as exc:
         logger.error("Failed to parse LLM response as JSON: %s", exc)
         return DecompositionResult(
@@ -221,13 +244,6 @@ async def decompose_command(
             token_usage=response.usage,
         )
 
-    # Handle case where LLM wraps in {"actions": [...]}
-    if isinstance(parsed, dict) and "actions" in parsed:
-        parsed = parsed["actions"]
-
-    # Validate actions
-    is_valid, actions, error = _validate_actions(parsed, scene)
-
     if not is_valid:
         logger.warning("Action validation failed: %s", error)
         return DecompositionResult(
@@ -241,8 +257,8 @@ async def decompose_command(
         )
 
     logger.info(
-        "Decomposed '%s' into %d actions via %s/%s",
-        command[:50],
+        "Decomposed '%.50s' into %d actions via %s/%s",
+        command,
         len(actions),
         response.provider.value,
         response.model,
@@ -269,11 +285,17 @@ async def decompose_command_with_retry(
     Increases temperature slightly on each retry.
     """
     last_result: DecompositionResult | None = None
+    # The scene doesn't change between attempts — describe it once
+    scene_description = describe_scene(scene)
 
     for attempt in range(max_retries + 1):
         temp = 0.1 + attempt * 0.15  # 0.1, 0.25, 0.4
         result = await decompose_command(
-            command, scene, llm_client, temperature=temp
+            command,
+            scene,
+            llm_client,
+            temperature=temp,
+            scene_description=scene_description,
         )
         if result.success:
             return result
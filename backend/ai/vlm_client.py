@@ -12,12 +12,24 @@ Usage:
 
 from __future__ import annotations
 
+import asyncio
+import base64
 import logging
 import os
+import time
+from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
-from typing import Any, List, Optional
+from typing import Any, AsyncIterator, Callable, List, Optional, Tuple, TypeVar, Union
 
 import httpx
+import orjson
+
+from ai.batching import RequestCoalescer
+
+try:  # SIMD base64 encoder for raw image bytes
+    from pybase64 import b64encode as _b64encode
+except ImportError:  # pragma: no cover - depends on the environment
+    _b64encode = base64.b64encode
 
 logger = logging.getLogger("kinesys.vlm")
 
@@ -29,6 +41,52 @@ OLLAMA_DEFAULT_HOST = "http://localhost:11434"
 OLLAMA_VLM_MODELS = ["pixtral:12b", "llava:13b", "llava:7b", "llava:latest"]
 OLLAMA_VLM_TIMEOUT_S = 120.0  # VLM inference is slower than text-only
 
+# Payloads are pre-encoded with orjson, so the content type is set explicitly
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Stands in for the images array while the rest of the chat body is serialized
+_IMAGES_PLACEHOLDER = "__kinesys_images__"
+_IMAGES_MARKER = orjson.dumps(_IMAGES_PLACEHOLDER)
+
+VLM_POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+# Concurrent /api/chat requests per Ollama host; extra callers wait here
+# instead of piling into Ollama's queue and thrashing the GPU's KV cache
+VLM_MAX_INFLIGHT = int(os.environ.get("OLLAMA_VLM_MAX_INFLIGHT", "2"))
+VLM_SLOT_WAIT_LOG_S = 0.1  # log requests that waited longer than this for a slot
+
+MODEL_CACHE_TTL_S = 300.0  # how long an /api/tags resolution is reused per host
+
+VLM_BATCH_MAX = 8  # requests coalesced into one dispatch round (batch=True only)
+VLM_BATCH_WINDOW_MS = 50.0  # how long the coalescer waits to fill a round
+
+
+# host -> pooled client shared by every VLMClient for that Ollama instance
+_shared_clients: dict[str, httpx.AsyncClient] = {}
+# Asyncio primitives only work on the loop that first uses them, so these
+# per-host registries hold (loop, primitive) and are rebuilt on a new loop
+# (test runs, uvicorn reloads); see _loop_local()
+# host -> semaphore bounding in-flight VLM requests across all clients
+_host_slots: dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = {}
+# host -> (resolved model, monotonic time of resolution), shared by all clients
+_model_cache: dict[str, Tuple[str, float]] = {}
+# One probe per host at a time, so concurrent cold clients don't all hit /api/tags
+_model_locks: dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Lock]] = {}
+
+_P = TypeVar("_P")
+
+
+def _loop_local(
+    registry: dict[str, Tuple[asyncio.AbstractEventLoop, _P]],
+    host: str,
+    factory: Callable[[], _P],
+) -> _P:
+    """Return the host's primitive for the running loop, creating it if needed."""
+    loop = asyncio.get_running_loop()
+    entry = registry.get(host)
+    if entry is None or entry[0] is not loop:
+        entry = registry[host] = (loop, factory())
+    return entry[1]
+
 
 @dataclass
 class VLMResponse:
@@ -45,6 +103,90 @@ class VLMResponse:
         return self.error is None and len(self.content) > 0
 
 
+# ---------------------------------------------------------------------------
+# Shared HTTP clients
+# ---------------------------------------------------------------------------
+
+
+def get_shared_vlm_client(host: str) -> httpx.AsyncClient:
+    """
+    Return the process-wide pooled client for an Ollama host.
+
+    Every VLMClient pointing at the same host reuses its connections, so
+    new clients don't pay connection setup. HTTP/2 is used when the host is
+    served over TLS; plain http:// Ollama stays on keep-alive HTTP/1.1.
+    """
+    client = _shared_clients.get(host)
+    if client is None or client.is_closed:
+        client = _shared_clients[host] = httpx.AsyncClient(
+            base_url=host,
+            timeout=OLLAMA_VLM_TIMEOUT_S,
+            limits=VLM_POOL_LIMITS,
+            http2=True,
+        )
+    return client
+
+
+async def close_shared_vlm_clients() -> None:
+    """Close the shared VLM HTTP clients. Call once on application shutdown."""
+    clients = list(_shared_clients.values())
+    _shared_clients.clear()
+    _host_slots.clear()
+    _model_locks.clear()
+    for client in clients:
+        if not client.is_closed:
+            await client.aclose()
+
+
+@asynccontextmanager
+async def _inference_slot(host: str) -> AsyncIterator[None]:
+    """Hold one of the host's VLM_MAX_INFLIGHT request slots."""
+    slots = _loop_local(_host_slots, host, lambda: asyncio.Semaphore(VLM_MAX_INFLIGHT))
+    start = time.monotonic()
+    async with slots:
+        waited = time.monotonic() - start
+        if waited > VLM_SLOT_WAIT_LOG_S:
+            logger.info("VLM request waited %.0fms for a slot on %s", waited * 1000, host)
+        yield
+
+
+# ---------------------------------------------------------------------------
+# Request body
+# ---------------------------------------------------------------------------
+
+
+def _frame_chat_body(payload: dict[str, Any]) -> Tuple[bytes, bytes]:
+    """
+    Serialize everything around the images array of an /api/chat body.
+
+    ``payload`` carries _IMAGES_PLACEHOLDER where the images array goes.
+    Returns the JSON before and after it.
+    """
+    head, tail = orjson.dumps(payload).split(_IMAGES_MARKER, 1)
+    return head, tail
+
+
+async def _stream_chat_body(head: bytes, tail: bytes, images: List[Union[str, bytes]]) -> AsyncIterator[bytes]:
+    """
+    Yield the /api/chat JSON body with the images spliced in one by one.
+
+    Only one image's encoding is materialized at a time, instead of a
+    second full copy of every frame inside a single serialized body.
+    """
+    yield head + b"["
+    for i, img in enumerate(images):
+        if i:
+            yield b","
+        if isinstance(img, bytes):
+            # base64 output needs no JSON escaping
+            yield b'"'
+            yield _b64encode(img)
+            yield b'"'
+        else:
+            yield orjson.dumps(img)
+    yield b"]" + tail
+
+
 # ---------------------------------------------------------------------------
 # VLM Client
 # ---------------------------------------------------------------------------
@@ -56,25 +198,32 @@ class VLMClient:
 
     Supports multi-image requests by embedding base64-encoded images
     directly in the Ollama /api/chat message format.
+
+    With ``batch=True``, concurrent calls are queued and a background
+    coalescer dispatches up to ``batch_max`` of them (or whatever arrives
+    within ``batch_window_ms``) together. Ollama has no multi-prompt chat
+    call, so a round is sent as parallel requests; set OLLAMA_NUM_PARALLEL
+    on the server so it actually runs them side by side.
     """
 
     def __init__(
         self,
         host: Optional[str] = None,
         model: Optional[str] = None,
+        batch: bool = False,
+        batch_max: int = VLM_BATCH_MAX,
+        batch_window_ms: float = VLM_BATCH_WINDOW_MS,
     ) -> None:
         self.host = host or os.environ.get("OLLAMA_HOST", OLLAMA_DEFAULT_HOST)
         self._preferred_model = model or os.environ.get("OLLAMA_VLM_MODEL")
         self._resolved_model: Optional[str] = None
-        self._http: Optional[httpx.AsyncClient] = None
+        self.batch = batch
+        self._batcher: RequestCoalescer[VLMResponse] = RequestCoalescer(
+            self._analyze, batch_max, batch_window_ms / 1000, "VLM"
+        )
 
     async def _get_http(self) -> httpx.AsyncClient:
-        if self._http is None or self._http.is_closed:
-            self._http = httpx.AsyncClient(
-                base_url=self.host,
-                timeout=OLLAMA_VLM_TIMEOUT_S,
-            )
-        return self._http
+        return get_shared_vlm_client(self.host)
 
     async def _resolve_model(self) -> str:
         """Find the first available VLM model on the Ollama instance."""
@@ -86,7 +235,20 @@ class VLMClient:
             self._resolved_model = self._preferred_model
             return self._resolved_model
 
-        # Probe Ollama for available models
+        async with _loop_local(_model_locks, self.host, asyncio.Lock):
+            cached = _model_cache.get(self.host)
+            if cached is not None and time.monotonic() - cached[1] < MODEL_CACHE_TTL_S:
+                model = cached[0]
+            else:
+                # Failures raise, so only successful resolutions are cached
+                model = await self._probe_model()
+                _model_cache[self.host] = (model, time.monotonic())
+
+        self._resolved_model = model
+        return model
+
+    async def _probe_model(self) -> str:
+        """Ask Ollama which models are available and pick the best VLM."""
         http = await self._get_http()
         try:
             resp = await http.get("/api/tags")
@@ -96,7 +258,6 @@ class VLMClient:
 
             for candidate in OLLAMA_VLM_MODELS:
                 if candidate in available:
-                    self._resolved_model = candidate
                     logger.info("Resolved VLM model: %s", candidate)
                     return candidate
 
@@ -104,7 +265,6 @@ class VLMClient:
                 base_name = candidate.split(":")[0]
                 for avail in available:
                     if avail.startswith(base_name):
-                        self._resolved_model = avail
                         logger.info("Resolved VLM model: %s (matched %s)", avail, candidate)
                         return avail
 
@@ -115,7 +275,6 @@ class VLMClient:
                     "No preferred VLM found. Using fallback: %s. "
                     "Available: %s", fallback, available
                 )
-                self._resolved_model = fallback
                 return fallback
 
             raise RuntimeError(
@@ -131,7 +290,7 @@ class VLMClient:
 
     async def analyze_images(
         self,
-        images_base64: List[str],
+        images_base64: List[Union[str, bytes]],
         system_prompt: str,
         user_prompt: str = "Analyze these demonstration keyframes and extract the procedural steps.",
         temperature: float = 0.1,
@@ -142,7 +301,8 @@ class VLMClient:
         Send multiple base64 images to the VLM with a system prompt.
 
         Args:
-            images_base64: List of base64-encoded image strings (no data: prefix).
+            images_base64: Base64-encoded image strings (a data: prefix is
+                stripped), or raw image bytes, which are encoded here.
             system_prompt: System instructions for the VLM.
             user_prompt: User message accompanying the images.
             temperature: Sampling temperature.
@@ -152,17 +312,52 @@ class VLMClient:
         Returns:
             VLMResponse with the model's analysis.
         """
+        args = (images_base64, system_prompt, user_prompt, temperature, max_tokens, json_mode)
+        if self.batch:
+            return await self._batcher.submit(args)
+        return await self._analyze(*args)
+
+    async def analyze_images_batch(
+        self,
+        requests: List[Tuple[List[Union[str, bytes]], str]],
+        user_prompt: str = "Analyze these demonstration keyframes and extract the procedural steps.",
+        temperature: float = 0.1,
+        max_tokens: int = 4096,
+        json_mode: bool = True,
+    ) -> List[VLMResponse]:
+        """
+        Analyze several (images_base64, system_prompt) requests at once.
+
+        Responses are returned in request order. The requests go out
+        concurrently (through the coalescer when ``batch=True``).
+        """
+        return list(await asyncio.gather(*(
+            self.analyze_images(images, system_prompt, user_prompt, temperature, max_tokens, json_mode)
+            for images, system_prompt in requests
+        )))
+
+    async def _analyze(
+        self,
+        images_base64: List[Union[str, bytes]],
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int,
+        json_mode: bool,
+    ) -> VLMResponse:
         model = await self._resolve_model()
         http = await self._get_http()
 
-        # Strip data URI prefix if present
-        cleaned_images = []
-        for img in images_base64:
-            if img.startswith("data:"):
+        # Strip data URI prefix if present; raw bytes are encoded while streaming.
+        # The list is only rebuilt when some image actually has a prefix
+        # (a bytes slice never equals the str "data:")
+        cleaned_images = images_base64
+        if any(img[:5] == "data:" for img in images_base64):
+            cleaned_images = [
                 # Remove "data:image/jpeg;base64," prefix
-                cleaned_images.append(img.split(",", 1)[-1])
-            else:
-                cleaned_images.append(img)
+                img.split(",", 1)[-1] if img[:5] == "data:" else img
+                for img in images_base64
+            ]
 
         # Build Ollama chat message with images
         # Ollama expects images as base64 strings in the "images" field
@@ -171,14 +366,15 @@ class VLMClient:
             {
                 "role": "user",
                 "content": user_prompt,
-                "images": cleaned_images,
+                "images": _IMAGES_PLACEHOLDER,  # streamed by _stream_chat_body
             },
         ]
 
         payload: dict[str, Any] = {
             "model": model,
             "messages": messages,
-            "stream": False,
+            # Streamed NDJSON: chunks are parsed while the model is still generating
+            "stream": True,
             "options": {
                 "temperature": temperature,
                 "num_predict": max_tokens,
@@ -193,12 +389,36 @@ class VLMClient:
             model, len(cleaned_images), json_mode,
         )
 
-        try:
-            resp = await http.post("/api/chat", json=payload)
-            resp.raise_for_status()
-            data = resp.json()
+        # Everything but the image transfer happens before taking an inference
+        # slot, so queued requests are ready to send the moment one frees up
+        head, tail = _frame_chat_body(payload)
 
-            content = data.get("message", {}).get("content", "")
+        try:
+            parts: List[str] = []
+            data: dict[str, Any] = {}
+            async with _inference_slot(self.host), http.stream(
+                "POST",
+                "/api/chat",
+                content=_stream_chat_body(head, tail, cleaned_images),
+                headers=JSON_HEADERS,
+            ) as resp:
+                if resp.is_error:
+                    await resp.aread()  # so the error handler can show the body
+                resp.raise_for_status()
+                async for line in resp.aiter_lines():
+                    if not line:
+                        continue
+                    data = orjson.loads(line)
+                    if "error" in data:
+                        error_msg = f"Ollama error: {data['error']}"
+                        logger.error(error_msg)
+                        return VLMResponse(content="", model=model, error=error_msg)
+                    parts.append(data.get("message", {}).get("content", ""))
+                    if data.get("done"):
+                        break
+
+            # The final chunk carries the token counts
+            content = "".join(parts)
             eval_count = data.get("eval_count", 0)
             prompt_count = data.get("prompt_eval_count", 0)
 
@@ -249,5 +469,5 @@ class VLMClient:
             )
 
     async def close(self) -> None:
-        if self._http and not self._http.is_closed:
-            await self._http.aclose()
+        await self._batcher.aclose()
+        # The HTTP client is shared; close_shared_vlm_clients() releases it
@@ -2,25 +2,30 @@
 
 from __future__ import annotations
 
-import json
+import asyncio
 import logging
+import os
+import time
+from contextlib import asynccontextmanager, suppress
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncIterator, Awaitable, Callable
 
+import orjson
 from dotenv import load_dotenv
 
 # Load .env from the backend directory before anything else
 load_dotenv(Path(__file__).resolve().parent.parent / ".env")
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import FastAPI, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import ORJSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from ai.llm_client import LLMClient
-from ai.task_decomposer import decompose_command
-from ai.scene_analyzer import scene_state_from_frontend
-from ai.vlm_client import VLMClient
-from ai.procedure_extractor import extract_procedure
+from ai.llm_client import LLMClient, LLMProvider, close_shared_client
+from ai.task_decomposer import _load_decompose_prompt, decompose_command
+from ai.scene_analyzer import scene_state_from_frontend, warm_relations_kernel
+from ai.vlm_client import VLMClient, close_shared_vlm_clients
+from ai.procedure_extractor import ProcedureCache, _load_system_prompt, extract_procedure
 from core.trajectory_planner import plan_trajectory
 from core.action_primitives import PRIMITIVE_REGISTRY
 from services.trajectory_recorder import get_recorder, remove_recorder
@@ -41,72 +46,199 @@ ACTION_TYPES_PATH = SHARED_DIR / "action_types.json"
 def load_action_types() -> dict[str, Any]:
     """Load and validate the shared action_types.json."""
     try:
-        with open(ACTION_TYPES_PATH, "r") as f:
-            data: dict[str, Any] = json.load(f)
+        data: dict[str, Any] = orjson.loads(ACTION_TYPES_PATH.read_bytes())
         logger.info("Loaded %d action primitives from %s", len(data.get("primitives", {})), ACTION_TYPES_PATH)
         return data
     except FileNotFoundError:
         logger.warning("action_types.json not found at %s — using empty primitives", ACTION_TYPES_PATH)
         return {"version": "0.0.0", "primitives": {}}
-    except json.JSONDecodeError as exc:
+    except orjson.JSONDecodeError as exc:
         logger.error("Failed to parse action_types.json: %s", exc)
         return {"version": "0.0.0", "primitives": {}}
 
 
 ACTION_TYPES = load_action_types()
+ACTION_TYPES_JSON = orjson.dumps(ACTION_TYPES)  # static; served as-is by /api/actions
+AVAILABLE_ACTIONS = tuple(ACTION_TYPES.get("primitives", {}))
+
+# The message sent on every WebSocket connect is static except for its
+# timestamp: serialize the rest once, minus the closing brace
+WELCOME_PREFIX = orjson.dumps({
+    "type": "connection",
+    "status": "connected",
+    "message": "Connected to KINESYS backend",
+    "available_actions": AVAILABLE_ACTIONS,
+}).decode()[:-1]
+
+# ---------------------------------------------------------------------------
+# Timestamps
+# ---------------------------------------------------------------------------
+
+_iso_cache: tuple[int, str] = (-1, "")  # (monotonic millisecond, ISO timestamp)
+
+
+def _iso_now() -> str:
+    """UTC ISO-8601 timestamp, regenerated at most once per millisecond."""
+    global _iso_cache
+    tick = time.monotonic_ns() // 1_000_000
+    if tick != _iso_cache[0]:
+        _iso_cache = (tick, datetime.now(timezone.utc).isoformat())
+    return _iso_cache[1]
+
 
 # ---------------------------------------------------------------------------
 # FastAPI Application
 # ---------------------------------------------------------------------------
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    global _llm_client, _vlm_client, _apprentice_vlm_client
+    # One LLMClient for the app's lifetime, so its cache and provider
+    # cooldowns persist across requests
+    # JIT-compile the scene relation kernel before the first request needs it
+    await asyncio.to_thread(warm_relations_kernel)
+    async with LLMClient() as client:
+        _llm_client = client
+        warmup = asyncio.create_task(warm_prompt_caches(client)) if PROMPT_CACHE_WARMUP else None
+        try:
+            yield
+        finally:
+            if warmup is not None:
+                warmup.cancel()
+                with suppress(asyncio.CancelledError):
+                    await warmup
+            _llm_client = None
+    # Stop the VLM batch coalescers; they are bound to this event loop
+    for vlm in (_vlm_client, _apprentice_vlm_client):
+        if vlm is not None:
+            await vlm.close()
+    _vlm_client = _apprentice_vlm_client = None
+    # Release the pooled upstream connections shared by all LLM/VLM clients
+    await close_shared_client()
+    await close_shared_vlm_clients()
+
+
 app = FastAPI(
     title="KINESYS",
     description="Human-Robot Interaction Platform — Backend API",
     version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+
+_CORS_ALLOW_ORIGIN = (b"access-control-allow-origin", b"*")
+_CORS_PREFLIGHT_HEADERS = [
+    _CORS_ALLOW_ORIGIN,
+    (b"access-control-allow-methods", b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"),
+    (b"access-control-max-age", b"600"),
+    (b"content-type", b"text/plain; charset=utf-8"),
+    (b"content-length", b"2"),
+]
+
+
+class OpenCORSMiddleware:
+    """
+    Fully open CORS (any origin, method and header) as fixed headers.
+
+    Same policy as CORSMiddleware with every allow_* set to "*", minus the
+    per-request origin matching. No credentials: nothing here uses cookies.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "OPTIONS":
+            headers = dict(scope["headers"])
+            if b"origin" in headers and b"access-control-request-method" in headers:
+                response_headers = list(_CORS_PREFLIGHT_HEADERS)
+                requested = headers.get(b"access-control-request-headers")
+                if requested:
+                    response_headers.append((b"access-control-allow-headers", requested))
+                await send({"type": "http.response.start", "status": 200, "headers": response_headers})
+                await send({"type": "http.response.body", "body": b"OK"})
+                return
+
+        async def send_with_cors(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), _CORS_ALLOW_ORIGIN]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+
+app.add_middleware(OpenCORSMiddleware)
 
 # ---------------------------------------------------------------------------
 # Connection Manager
 # ---------------------------------------------------------------------------
 
 
+# NumPy values and non-string keys can appear in plan/scene payloads
+WS_JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def encode_message(data: dict[str, Any]) -> str:
+    """Serialize an outbound WebSocket message (text frame: the frontend parses strings)."""
+    return orjson.dumps(data, option=WS_JSON_OPTIONS).decode()
+
+
 class ConnectionManager:
     """Manages active WebSocket connections."""
 
     def __init__(self) -> None:
-        self.active_connections: list[WebSocket] = []
+        self.active_connections: set[WebSocket] = set()
+        self._snapshot: tuple[WebSocket, ...] | None = None
 
     async def connect(self, websocket: WebSocket) -> None:
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections.add(websocket)
+        self._snapshot = None
         logger.info("Client connected. Total connections: %d", len(self.active_connections))
 
     def disconnect(self, websocket: WebSocket) -> None:
-        self.active_connections.remove(websocket)
+        self.active_connections.discard(websocket)
+        self._snapshot = None
         logger.info("Client disconnected. Total connections: %d", len(self.active_connections))
 
     async def send_json(self, websocket: WebSocket, data: dict[str, Any]) -> None:
-        await websocket.send_json(data)
+        await websocket.send_text(encode_message(data))
 
     async def broadcast(self, data: dict[str, Any]) -> None:
-        for connection in self.active_connections:
+        # Serialize once and send to every client concurrently
+        payload = encode_message(data)
+        # Immutable view, rebuilt only after connect/disconnect; tolerates
+        # disconnects mid-send
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._snapshot = tuple(self.active_connections)
+        failures: list[Exception] = []
+
+        async def send(connection: WebSocket) -> None:
+            # Collected rather than raised: one dead client must not make
+            # the TaskGroup cancel delivery to the others
             try:
-                await connection.send_json(data)
-            except Exception:
-                logger.exception("Failed to broadcast to a client")
+                await connection.send_text(payload)
+            except Exception as exc:
+                failures.append(exc)
+
+        async with asyncio.TaskGroup() as tg:
+            for connection in snapshot:
+                tg.create_task(send(connection))
+        for exc in failures:
+            logger.error("Failed to broadcast to a client", exc_info=exc)
 
 
 manager = ConnectionManager()
 
 # ---------------------------------------------------------------------------
-# LLM Client (singleton, lazy-init)
+# LLM Client (singleton, opened by lifespan; lazy-init outside the app)
 # ---------------------------------------------------------------------------
 
 _llm_client: LLMClient | None = None
@@ -130,16 +262,16 @@ async def root() -> dict[str, str]:
 
 
 @app.get("/api/actions")
-async def get_action_types() -> dict[str, Any]:
+async def get_action_types() -> Response:
     """Return the shared action primitive definitions."""
-    return ACTION_TYPES
+    return Response(content=ACTION_TYPES_JSON, media_type="application/json")
 
 
 @app.get("/api/health")
 async def health_check() -> dict[str, Any]:
     return {
         "status": "healthy",
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "timestamp": _iso_now(),
         "connections": len(manager.active_connections),
     }
 
@@ -148,16 +280,84 @@ async def health_check() -> dict[str, Any]:
 # VLM Client (singleton, lazy-init)
 # ---------------------------------------------------------------------------
 
+# Set OLLAMA_VLM_BATCH=1 to coalesce concurrent teach extractions into dispatch
+# rounds. Off by default: a lone extraction would wait out the batch window for
+# nothing, and the per-host inference slots already bound concurrency
+VLM_BATCH = os.environ.get("OLLAMA_VLM_BATCH", "0") != "0"
+
 _vlm_client: VLMClient | None = None
+_apprentice_vlm_client: VLMClient | None = None
+
+# Past teach extractions, so repeated demonstrations skip the VLM
+procedure_cache = ProcedureCache()
 
 
 def get_vlm_client() -> VLMClient:
     global _vlm_client
     if _vlm_client is None:
-        _vlm_client = VLMClient()
+        _vlm_client = VLMClient(batch=VLM_BATCH)
     return _vlm_client
 
 
+def get_apprentice_vlm_client() -> VLMClient | None:
+    """Smaller VLM for near-duplicate demonstrations, if OLLAMA_VLM_APPRENTICE_MODEL is set."""
+    global _apprentice_vlm_client
+    model = os.environ.get("OLLAMA_VLM_APPRENTICE_MODEL")
+    if model and _apprentice_vlm_client is None:
+        _apprentice_vlm_client = VLMClient(model=model, batch=VLM_BATCH)
+    return _apprentice_vlm_client
+
+
+# ---------------------------------------------------------------------------
+# Prompt cache warm-up
+# ---------------------------------------------------------------------------
+
+# Set PROMPT_CACHE_WARMUP=0 to skip the startup requests (e.g. to save quota)
+PROMPT_CACHE_WARMUP = os.environ.get("PROMPT_CACHE_WARMUP", "1") != "0"
+
+
+async def warm_prompt_caches(llm_client: LLMClient) -> None:
+    """
+    Send each static system prompt once with a 1-token reply at startup.
+
+    Providers keep the prefill of a recently seen prefix, and Ollama loads
+    the model on first use, so the first real command or demonstration
+    doesn't pay either cost. Failures are logged and otherwise ignored.
+    """
+    # Straight to the primary provider, bypassing LLMClient.chat: a failed
+    # warm-up must not put it into cooldown, and a 1-token answer must not
+    # land in the response cache
+    provider = {
+        LLMProvider.GROQ: llm_client.groq,
+        LLMProvider.GEMINI: llm_client.gemini,
+        LLMProvider.OLLAMA: llm_client.ollama,
+    }[llm_client.primary_provider]
+    results = await asyncio.gather(
+        provider.chat(
+            messages=[
+                {"role": "system", "content": _load_decompose_prompt()},
+                {"role": "user", "content": "ping"},
+            ],
+            temperature=0.0,
+            max_tokens=1,
+        ),
+        get_vlm_client().analyze_images(
+            images_base64=[],
+            system_prompt=_load_system_prompt(),
+            user_prompt="ping",
+            max_tokens=1,
+            json_mode=False,
+        ),
+        return_exceptions=True,
+    )
+    for name, result in zip(("LLM", "VLM"), results):
+        error = result if isinstance(result, BaseException) else getattr(result, "error", None)
+        if error:
+            logger.info("%s prompt warm-up skipped: %s", name, error)
+        else:
+            logger.info("%s prompt warm-up done: model=%s, usage=%s", name, result.model, result.usage)
+
+
 # ---------------------------------------------------------------------------
 # Voice Command Pipeline
 # ---------------------------------------------------------------------------
@@ -170,9 +370,20 @@ async def handle_voice_command(
     """
     Full voice command pipeline:
       transcript → LLM decomposition → trajectory planning → safety validation → response
+
+    With ``verbose_status: false`` the intermediate status_update frames are
+    skipped and listed in the result's ``states_traversed`` instead.
     """
     command: str = data.get("command", "").strip()
     scene_data: dict[str, Any] = data.get("scene", {})
+    verbose_status = data.get("verbose_status", True) is not False
+    states_traversed: list[str] = []
+
+    async def send_status(state: str) -> None:
+        if verbose_status:
+            await manager.send_json(websocket, {"type": "status_update", "state": state})
+        else:
+            states_traversed.append(state)
 
     if not command:
         await manager.send_json(websocket, {
@@ -184,10 +395,7 @@ async def handle_voice_command(
     logger.info("Voice command: '%s'", command)
 
     # 1. Send THINKING status
-    await manager.send_json(websocket, {
-        "type": "status_update",
-        "state": "THINKING",
-    })
+    await send_status("THINKING")
 
     # 2. Parse scene state from frontend
     try:
@@ -201,10 +409,7 @@ async def handle_voice_command(
         return
 
     # 3. LLM task decomposition
-    await manager.send_json(websocket, {
-        "type": "status_update",
-        "state": "PLANNING",
-    })
+    await send_status("PLANNING")
 
     llm = get_llm_client()
     decomposition = await decompose_command(command, scene, llm_client=llm)
@@ -220,40 +425,27 @@ async def handle_voice_command(
     logger.info("Decomposed into %d actions", len(decomposition.actions))
 
     # 4. Trajectory planning + safety validation
-    await manager.send_json(websocket, {
-        "type": "status_update",
-        "state": "VALIDATING",
-    })
+    await send_status("VALIDATING")
 
     plan = plan_trajectory(decomposition.actions, scene)
 
-    # 5. Build response with waypoints
-    waypoints_list = [
-        {
-            "x": wp.x,
-            "y": wp.y,
-            "z": wp.z,
-            "roll": wp.roll,
-            "pitch": wp.pitch,
-            "yaw": wp.yaw,
-            "gripper_open": wp.gripper_open,
-        }
-        for wp in plan.all_waypoints
-    ]
-
-    # Build confirmation message from narrations
+    # 5. Build response. Waypoint dataclasses go straight to orjson, which
+    #    emits the same x/y/z/roll/pitch/yaw/gripper_open keys.
     if plan.narration_sequence:
         confirmation = "Done. " + ". ".join(plan.narration_sequence) + "."
     else:
         confirmation = "Done."
 
-    await manager.send_json(websocket, {
+    result: dict[str, Any] = {
         "type": "plan_result",
         "plan": plan.to_dict(),
-        "waypoints": waypoints_list,
+        "waypoints": plan.all_waypoints,
         "confirmation": confirmation,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-    })
+        "timestamp": _iso_now(),
+    }
+    if not verbose_status:
+        result["states_traversed"] = states_traversed
+    await manager.send_json(websocket, result)
 
 
 # ---------------------------------------------------------------------------
@@ -278,12 +470,14 @@ async def handle_teach_extract(
         })
         return
 
-    # Extract base64 images from keyframe objects
-    images_b64: list[str] = []
-    for kf in keyframes:
-        img = kf.get("imageBase64", "") if isinstance(kf, dict) else str(kf)
-        if img:
-            images_b64.append(img)
+    # Extract base64 images from keyframe objects. The strings are shared
+    # with the decoded message, not copied; they stay base64 because the
+    # extractor hashes them and Ollama takes them in that form
+    images_b64: list[str] = [
+        img
+        for kf in keyframes
+        if (img := kf.get("imageBase64", "") if isinstance(kf, dict) else str(kf))
+    ]
 
     if len(images_b64) < 2:
         await manager.send_json(websocket, {
@@ -306,6 +500,8 @@ async def handle_teach_extract(
         images_base64=images_b64,
         vlm_client=vlm,
         confidence_threshold=confidence_threshold,
+        cache=procedure_cache,
+        apprentice_client=get_apprentice_vlm_client(),
     )
 
     if not result.success:
@@ -316,19 +512,20 @@ async def handle_teach_extract(
         })
         return
 
-    logger.info(
-        "Teach extraction: %d actions, %d need confirmation",
-        len(result.actions),
-        sum(1 for a in result.actions if a.needs_confirmation),
-    )
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "Teach extraction: %d actions, %d need confirmation",
+            len(result.actions),
+            sum(a.needs_confirmation for a in result.actions),
+        )
 
     await manager.send_json(websocket, {
         "type": "teach_extract_result",
-        "actions": [a.to_dict() for a in result.actions],
+        "actions": result.actions,  # dataclasses, encoded directly by orjson
         "summary": result.summary,
         "objects_detected": result.objects_detected,
         "frame_count": result.frame_count,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "timestamp": _iso_now(),
     })
 
 
@@ -368,28 +565,9 @@ async def handle_teach_execute(
         "state": "PLANNING",
     })
 
-    # Convert confirmed actions to trajectory planner format
-    planner_actions = []
-    for action in confirmed_actions:
-        planner_actions.append({
-            "action": action.get("action", ""),
-            "params": action.get("params", {}),
-        })
-
-    plan = plan_trajectory(planner_actions, scene)
-
-    waypoints_list = [
-        {
-            "x": wp.x,
-            "y": wp.y,
-            "z": wp.z,
-            "roll": wp.roll,
-            "pitch": wp.pitch,
-            "yaw": wp.yaw,
-            "gripper_open": wp.gripper_open,
-        }
-        for wp in plan.all_waypoints
-    ]
+    # Confirmed actions are already {"action", "params", ...} objects; the
+    # planner reads only those two keys, so they go in without copying
+    plan = plan_trajectory(confirmed_actions, scene)
 
     if plan.narration_sequence:
         confirmation = "Executing taught procedure. " + ". ".join(plan.narration_sequence) + "."
@@ -399,10 +577,10 @@ async def handle_teach_execute(
     await manager.send_json(websocket, {
         "type": "plan_result",
         "plan": plan.to_dict(),
-        "waypoints": waypoints_list,
+        "waypoints": plan.all_waypoints,
         "confirmation": confirmation,
         "source": "teach_mode",
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "timestamp": _iso_now(),
     })
 
 
@@ -420,7 +598,9 @@ async def handle_guide_record(
     Store a hand-teleoperation trajectory received from the frontend.
     Expects: { type, trajectory_id, points: [{timestamp_ms, x, y, z, gripper_open}], metadata }
     """
-    trajectory_id: str = data.get("trajectory_id", f"traj_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}")
+    trajectory_id: str | None = data.get("trajectory_id")
+    if trajectory_id is None:  # only format a fallback id when the client sent none
+        trajectory_id = f"traj_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}"
     points_raw: list[dict[str, Any]] = data.get("points", [])
     metadata: dict[str, Any] = data.get("metadata", {})
 
@@ -444,7 +624,7 @@ async def handle_guide_record(
         "trajectory_id": traj.id,
         "point_count": traj.point_count,
         "duration_ms": traj.duration_ms,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "timestamp": _iso_now(),
     })
 
 
@@ -479,10 +659,23 @@ async def handle_guide_replay_cancel(
     recorder.cancel_replay()
     await manager.send_json(websocket, {
         "type": "guide_replay_cancelled",
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "timestamp": _iso_now(),
     })
 
 
+# Message type → handler(websocket, data, connection_id); types not listed
+# here are echoed back
+MESSAGE_HANDLERS: dict[str, Callable[[WebSocket, dict[str, Any], str], Awaitable[None]]] = {
+    "voice_command": lambda ws, data, cid: handle_voice_command(ws, data),
+    "teach_extract": lambda ws, data, cid: handle_teach_extract(ws, data),
+    "teach_execute": lambda ws, data, cid: handle_teach_execute(ws, data),
+    "guide_record": handle_guide_record,
+    "guide_replay": handle_guide_replay,
+    "guide_replay_cancel": lambda ws, data, cid: handle_guide_replay_cancel(ws, cid),
+    "ping": lambda ws, data, cid: manager.send_json(ws, {"type": "pong"}),
+}
+
+
 # ---------------------------------------------------------------------------
 # WebSocket Endpoint
 # ---------------------------------------------------------------------------
@@ -496,51 +689,43 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
     connection_id = str(id(websocket))
 
     # Send welcome message with server info
-    await manager.send_json(websocket, {
-        "type": "connection",
-        "status": "connected",
-        "message": "Connected to KINESYS backend",
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "available_actions": list(ACTION_TYPES.get("primitives", {}).keys()),
-    })
+    await websocket.send_text(f'{WELCOME_PREFIX},"timestamp":"{_iso_now()}"}}')
 
     try:
         while True:
-            raw = await websocket.receive_text()
+            # Accept text or binary frames; orjson parses either without
+            # an extra decode pass
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+            raw = message.get("bytes") or message.get("text") or b""
 
             try:
-                data: dict[str, Any] = json.loads(raw)
-            except json.JSONDecodeError:
+                data = orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                data = None
+            # Only JSON objects are messages; anything else would fail on .get() below
+            if not isinstance(data, dict):
                 await manager.send_json(websocket, {
                     "type": "error",
                     "message": "Invalid JSON payload",
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "timestamp": _iso_now(),
                 })
                 continue
 
             msg_type = data.get("type", "unknown")
             logger.info("Received message type=%s", msg_type)
 
-            if msg_type == "voice_command":
-                await handle_voice_command(websocket, data)
-            elif msg_type == "teach_extract":
-                await handle_teach_extract(websocket, data)
-            elif msg_type == "teach_execute":
-                await handle_teach_execute(websocket, data)
-            elif msg_type == "guide_record":
-                await handle_guide_record(websocket, data, connection_id)
-            elif msg_type == "guide_replay":
-                await handle_guide_replay(websocket, data, connection_id)
-            elif msg_type == "guide_replay_cancel":
-                await handle_guide_replay_cancel(websocket, connection_id)
-            elif msg_type == "ping":
-                await manager.send_json(websocket, {"type": "pong"})
+            # A non-string type (e.g. a list) may be unhashable; echo it
+            handler = MESSAGE_HANDLERS.get(msg_type) if isinstance(msg_type, str) else None
+            if handler is not None:
+                await handler(websocket, data, connection_id)
             else:
                 # Echo for other message types
                 await manager.send_json(websocket, {
                     "type": "echo",
                     "original": data,
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "timestamp": _iso_now(),
                     "server": "kinesys-backend",
                 })
 
@@ -11,17 +11,20 @@ provides:
 from __future__ import annotations
 
 import math
-from abc import ABC, abstractmethod
+import sys
 from dataclasses import dataclass, field
 from enum import Enum
+from functools import lru_cache
 from typing import Any
 
+import numpy as np
+
 # ---------------------------------------------------------------------------
 # Data structures
 # ---------------------------------------------------------------------------
 
 
-@dataclass(frozen=True)
+@dataclass(slots=True, frozen=True)
 class Waypoint:
     """A single 6-DOF robot pose + gripper state."""
 
@@ -34,7 +37,69 @@ class Waypoint:
     gripper_open: bool = True
 
 
-@dataclass
+# Columns of waypoints_to_array()
+WP_X, WP_Y, WP_Z, WP_ROLL, WP_PITCH, WP_YAW, WP_GRIP = range(7)
+
+
+def waypoints_to_array(waypoints: list[Waypoint]) -> np.ndarray:
+    """
+    Pack waypoints into an (N, 7) float64 array, one column per field.
+
+    gripper_open is stored as 1.0/0.0. Lets whole-trajectory checks run as
+    array operations instead of per-waypoint attribute reads.
+    """
+    return np.array(
+        [(wp.x, wp.y, wp.z, wp.roll, wp.pitch, wp.yaw, wp.gripper_open) for wp in waypoints],
+        dtype=np.float64,
+    ).reshape(-1, 7)
+
+
+@lru_cache(maxsize=1024, typed=True)
+def _hold_waypoint(x: float, y: float, z: float, gripper_open: bool) -> Waypoint:
+    """
+    Shared Waypoint for a stationary pose (Release, Wait).
+
+    Waypoint is frozen, so one instance can appear in any number of plans;
+    long plans repeat the same hold pose many times.
+    """
+    return Waypoint(x, y, z, gripper_open=gripper_open)
+
+
+def _first_below(waypoints: list[Waypoint], threshold: float) -> int:
+    """Index of the first waypoint with y < threshold, or -1."""
+    for i, wp in enumerate(waypoints):
+        if wp.y < threshold:
+            return i
+    return -1
+
+
+def _lift_lateral_descend(
+    start: tuple[float, float, float],
+    target: tuple[float, float, float],
+    safe_y: float,
+    lift_open: bool,
+    move_open: bool,
+) -> list[Waypoint]:
+    """Lift to safe_y, move across at safe_y, descend onto target (Approach, Translate)."""
+    tx, ty, tz = target
+    return [
+        Waypoint(start[0], safe_y, start[2], gripper_open=lift_open),
+        Waypoint(tx, safe_y, tz, gripper_open=move_open),
+        Waypoint(tx, ty, tz, gripper_open=move_open),
+    ]
+
+
+def _lower_and_release(x: float, z: float, low_y: float, safe_y: float) -> list[Waypoint]:
+    """Above, lowered, released, retreated — the closing moves of Place and Stack."""
+    return [
+        Waypoint(x, safe_y, z, gripper_open=False),
+        Waypoint(x, low_y, z, gripper_open=False),
+        Waypoint(x, low_y, z, gripper_open=True),
+        Waypoint(x, safe_y, z, gripper_open=True),
+    ]
+
+
+@dataclass(slots=True)
 class SceneObject:
     """An object in the simulation scene."""
 
@@ -47,7 +112,7 @@ class SceneObject:
     is_held: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class SceneState:
     """Current state of the simulation scene."""
 
@@ -64,7 +129,7 @@ class ValidationStatus(Enum):
     WARNING = "warning"
 
 
-@dataclass
+@dataclass(slots=True)
 class ValidationResult:
     """Result of a safety validation check."""
 
@@ -79,31 +144,33 @@ class ValidationResult:
 
 
 # ---------------------------------------------------------------------------
-# Abstract base
+# Base class
 # ---------------------------------------------------------------------------
 
 
-class ActionPrimitive(ABC):
-    """Base class for all action primitives."""
+class ActionPrimitive:
+    """Base class for all action primitives.
+
+    A plain class rather than an ABC: the registry holds one instance of
+    each primitive and is never extended at runtime, so ABCMeta's
+    instantiation checks buy nothing.
+    """
 
     primitive_id: str = ""
     description: str = ""
 
-    @abstractmethod
     def generate_waypoints(
         self, params: dict[str, Any], scene: SceneState
     ) -> list[Waypoint]:
-        ...
+        raise NotImplementedError
 
-    @abstractmethod
     def validate(
         self, waypoints: list[Waypoint], scene: SceneState
     ) -> ValidationResult:
-        ...
+        raise NotImplementedError
 
-    @abstractmethod
     def describe(self, params: dict[str, Any] | None = None) -> str:
-        ...
+        raise NotImplementedError
 
     def _get_object(self, scene: SceneState, object_id: str) -> SceneObject:
         """Retrieve an object from the scene or raise."""
@@ -129,44 +196,26 @@ class Approach(ActionPrimitive):
         offset = params.get("offset", [0.0, 0.05, 0.0])
         obj = self._get_object(scene, target_id)
 
-        # Lift to safe height first
+        # Lift to safe height, move above target, descend to offset position
         safe_y = max(scene.table_height + 0.4, scene.end_effector[1])
-        wp_lift = Waypoint(
-            x=scene.end_effector[0],
-            y=safe_y,
-            z=scene.end_effector[2],
-            gripper_open=scene.gripper_open,
-        )
+        pos = obj.position
+        target = (pos[0] + offset[0], pos[1] + offset[1], pos[2] + offset[2])
 
-        # Move above target
-        wp_above = Waypoint(
-            x=obj.position[0] + offset[0],
-            y=safe_y,
-            z=obj.position[2] + offset[2],
-            gripper_open=True,
-        )
-
-        # Descend to offset position
-        wp_approach = Waypoint(
-            x=obj.position[0] + offset[0],
-            y=obj.position[1] + offset[1],
-            z=obj.position[2] + offset[2],
-            gripper_open=True,
+        return _lift_lateral_descend(
+            scene.end_effector, target, safe_y, scene.gripper_open, True
         )
 
-        return [wp_lift, wp_above, wp_approach]
-
     def validate(
         self, waypoints: list[Waypoint], scene: SceneState
     ) -> ValidationResult:
-        for i, wp in enumerate(waypoints):
-            if wp.y < scene.table_height:
-                return ValidationResult(
-                    ValidationStatus.FAIL,
-                    f"Waypoint {i} below table surface (y={wp.y:.3f})",
-                    "table_collision",
-                    i,
-                )
+        i = _first_below(waypoints, scene.table_height)
+        if i >= 0:
+            return ValidationResult(
+                ValidationStatus.FAIL,
+                f"Waypoint {i} below table surface (y={waypoints[i].y:.3f})",
+                "table_collision",
+                i,
+            )
         return ValidationResult(ValidationStatus.PASS, "Approach trajectory valid")
 
     def describe(self, params: dict[str, Any] | None = None) -> str:
@@ -236,13 +285,8 @@ class Release(ActionPrimitive):
         self, params: dict[str, Any], scene: SceneState
     ) -> list[Waypoint]:
         # Open gripper at current position
-        wp = Waypoint(
-            x=scene.end_effector[0],
-            y=scene.end_effector[1],
-            z=scene.end_effector[2],
-            gripper_open=True,
-        )
-        return [wp]
+        x, y, z = scene.end_effector
+        return [_hold_waypoint(x, y, z, True)]
 
     def validate(
         self, waypoints: list[Waypoint], scene: SceneState
@@ -289,32 +333,19 @@ class Translate(ActionPrimitive):
         # Safe lift, lateral move, descend
         safe_y = max(scene.table_height + 0.4, scene.end_effector[1], target[1])
 
-        wp_lift = Waypoint(
-            x=scene.end_effector[0],
-            y=safe_y,
-            z=scene.end_effector[2],
-            gripper_open=gripper,
-        )
-        wp_lateral = Waypoint(
-            x=target[0], y=safe_y, z=target[2], gripper_open=gripper
-        )
-        wp_descend = Waypoint(
-            x=target[0], y=target[1], z=target[2], gripper_open=gripper
-        )
-
-        return [wp_lift, wp_lateral, wp_descend]
+        return _lift_lateral_descend(scene.end_effector, target, safe_y, gripper, gripper)
 
     def validate(
         self, waypoints: list[Waypoint], scene: SceneState
     ) -> ValidationResult:
-        for i, wp in enumerate(waypoints):
-            if wp.y < scene.table_height:
-                return ValidationResult(
-                    ValidationStatus.FAIL,
-                    f"Waypoint {i} below table (y={wp.y:.3f})",
-                    "table_collision",
-                    i,
-                )
+        i = _first_below(waypoints, scene.table_height)
+        if i >= 0:
+            return ValidationResult(
+                ValidationStatus.FAIL,
+                f"Waypoint {i} below table (y={waypoints[i].y:.3f})",
+                "table_collision",
+                i,
+            )
         return ValidationResult(ValidationStatus.PASS, "Translation valid")
 
     def describe(self, params: dict[str, Any] | None = None) -> str:
@@ -343,31 +374,21 @@ class Rotate(ActionPrimitive):
         degrees: float = float(params["degrees"])
         rads = math.radians(degrees)
 
-        roll, pitch, yaw = 0.0, 0.0, 0.0
-        if axis == "x":
-            roll = rads
-        elif axis == "y":
-            yaw = rads
-        elif axis == "z":
-            pitch = rads
-
-        # Interpolate in steps for smooth animation
+        # Interpolate in steps for smooth animation; only the rotated axis
+        # varies, the other two stay at zero
         steps = max(2, int(abs(degrees) / 15))
-        waypoints: list[Waypoint] = []
-        for i in range(1, steps + 1):
-            t = i / steps
-            waypoints.append(
-                Waypoint(
-                    x=scene.end_effector[0],
-                    y=scene.end_effector[1],
-                    z=scene.end_effector[2],
-                    roll=roll * t,
-                    pitch=pitch * t,
-                    yaw=yaw * t,
-                    gripper_open=scene.gripper_open,
-                )
-            )
-        return waypoints
+        angles = (rads * (np.arange(1, steps + 1) / steps)).tolist()
+        still = [0.0] * steps
+        rolls = angles if axis == "x" else still
+        yaws = angles if axis == "y" else still
+        pitches = angles if axis == "z" else still
+
+        x, y, z = scene.end_effector
+        gripper_open = scene.gripper_open
+        return [
+            Waypoint(x, y, z, roll, pitch, yaw, gripper_open)
+            for roll, pitch, yaw in zip(rolls, pitches, yaws)
+        ]
 
     def validate(
         self, waypoints: list[Waypoint], scene: SceneState
@@ -376,15 +397,21 @@ class Rotate(ActionPrimitive):
         for i in range(1, len(waypoints)):
             prev = waypoints[i - 1]
             curr = waypoints[i]
-            for attr in ("roll", "pitch", "yaw"):
-                delta = abs(getattr(curr, attr) - getattr(prev, attr))
-                if delta > max_angular_vel:
-                    return ValidationResult(
-                        ValidationStatus.FAIL,
-                        f"Angular velocity exceeded on {attr} at waypoint {i}",
-                        "max_angular_velocity",
-                        i,
-                    )
+            # Checked in roll, pitch, yaw order with direct attribute reads
+            if abs(curr.roll - prev.roll) > max_angular_vel:
+                attr = "roll"
+            elif abs(curr.pitch - prev.pitch) > max_angular_vel:
+                attr = "pitch"
+            elif abs(curr.yaw - prev.yaw) > max_angular_vel:
+                attr = "yaw"
+            else:
+                continue
+            return ValidationResult(
+                ValidationStatus.FAIL,
+                f"Angular velocity exceeded on {attr} at waypoint {i}",
+                "max_angular_velocity",
+                i,
+            )
         return ValidationResult(ValidationStatus.PASS, "Rotation valid")
 
     def describe(self, params: dict[str, Any] | None = None) -> str:
@@ -419,17 +446,10 @@ class Place(ActionPrimitive):
         gentle = params.get("gentle", True)
         safe_y = max(scene.table_height + 0.4, target[1] + 0.2)
 
-        # Move above placement, descend gently, release
-        wp_above = Waypoint(x=target[0], y=safe_y, z=target[2], gripper_open=False)
-
+        # Move above placement, descend gently, release, retreat upward
         descent_y = target[1] + (0.02 if gentle else 0.05)
-        wp_place = Waypoint(x=target[0], y=descent_y, z=target[2], gripper_open=False)
-        wp_release = Waypoint(x=target[0], y=descent_y, z=target[2], gripper_open=True)
 
-        # Retreat upward
-        wp_retreat = Waypoint(x=target[0], y=safe_y, z=target[2], gripper_open=True)
-
-        return [wp_above, wp_place, wp_release, wp_retreat]
+        return _lower_and_release(target[0], target[2], descent_y, safe_y)
 
     def validate(
         self, waypoints: list[Waypoint], scene: SceneState
@@ -440,14 +460,14 @@ class Place(ActionPrimitive):
                 "Cannot place — no object held",
                 "no_object_held",
             )
-        for i, wp in enumerate(waypoints):
-            if wp.y < scene.table_height - 0.01:
-                return ValidationResult(
-                    ValidationStatus.FAIL,
-                    f"Placement waypoint {i} below table",
-                    "table_collision",
-                    i,
-                )
+        i = _first_below(waypoints, scene.table_height - 0.01)
+        if i >= 0:
+            return ValidationResult(
+                ValidationStatus.FAIL,
+                f"Placement waypoint {i} below table",
+                "table_collision",
+                i,
+            )
         return ValidationResult(ValidationStatus.PASS, "Placement valid")
 
     def describe(self, params: dict[str, Any] | None = None) -> str:
@@ -477,41 +497,41 @@ class Push(ActionPrimitive):
         obj = self._get_object(scene, target_id)
 
         # Normalize direction
-        mag = math.sqrt(sum(d * d for d in direction))
+        d0, d1, d2 = direction
+        mag = math.sqrt(d0 * d0 + d1 * d1 + d2 * d2)
         if mag < 1e-6:
             raise ValueError("Push direction vector has zero magnitude")
-        norm_dir = [d / mag for d in direction]
+        nx, ny, nz = d0 / mag, d1 / mag, d2 / mag
+
+        ox, oy, oz = obj.position
+        push_x = ox + nx * distance
+        push_z = oz + nz * distance
 
         # Approach from opposite side of push direction
         approach_offset = 0.08
         wp_approach = Waypoint(
-            x=obj.position[0] - norm_dir[0] * approach_offset,
-            y=obj.position[1],
-            z=obj.position[2] - norm_dir[2] * approach_offset,
+            x=ox - nx * approach_offset,
+            y=oy,
+            z=oz - nz * approach_offset,
             gripper_open=False,
         )
 
         # Contact point
-        wp_contact = Waypoint(
-            x=obj.position[0],
-            y=obj.position[1],
-            z=obj.position[2],
-            gripper_open=False,
-        )
+        wp_contact = Waypoint(x=ox, y=oy, z=oz, gripper_open=False)
 
         # Push through
         wp_push = Waypoint(
-            x=obj.position[0] + norm_dir[0] * distance,
-            y=obj.position[1] + norm_dir[1] * distance,
-            z=obj.position[2] + norm_dir[2] * distance,
+            x=push_x,
+            y=oy + ny * distance,
+            z=push_z,
             gripper_open=False,
         )
 
         # Retract
         wp_retract = Waypoint(
-            x=obj.position[0] + norm_dir[0] * distance,
-            y=obj.position[1] + 0.15,
-            z=obj.position[2] + norm_dir[2] * distance,
+            x=push_x,
+            y=oy + 0.15,
+            z=push_z,
             gripper_open=True,
         )
 
@@ -520,14 +540,14 @@ class Push(ActionPrimitive):
     def validate(
         self, waypoints: list[Waypoint], scene: SceneState
     ) -> ValidationResult:
-        for i, wp in enumerate(waypoints):
-            if wp.y < scene.table_height - 0.01:
-                return ValidationResult(
-                    ValidationStatus.FAIL,
-                    f"Push waypoint {i} below table",
-                    "table_collision",
-                    i,
-                )
+        i = _first_below(waypoints, scene.table_height - 0.01)
+        if i >= 0:
+            return ValidationResult(
+                ValidationStatus.FAIL,
+                f"Push waypoint {i} below table",
+                "table_collision",
+                i,
+            )
         return ValidationResult(ValidationStatus.PASS, "Push trajectory valid")
 
     def describe(self, params: dict[str, Any] | None = None) -> str:
@@ -541,6 +561,13 @@ class Push(ActionPrimitive):
 # ---------------------------------------------------------------------------
 
 
+@lru_cache(maxsize=64)
+def _pour_tilt_profile(angle: float) -> tuple[float, ...]:
+    """Roll angles (radians) of the pour tilt ramp; pours reuse a few angles."""
+    steps = max(3, int(angle / 20))
+    return tuple(math.radians(angle * (i / steps)) for i in range(1, steps + 1))
+
+
 class Pour(ActionPrimitive):
     primitive_id = "POUR"
     description = "Tilt a grasped container to pour contents"
@@ -562,19 +589,10 @@ class Pour(ActionPrimitive):
         )
 
         # Tilt gradually
-        steps = max(3, int(angle / 20))
-        tilt_wps: list[Waypoint] = []
-        for i in range(1, steps + 1):
-            t = i / steps
-            tilt_wps.append(
-                Waypoint(
-                    x=pour_x,
-                    y=pour_y,
-                    z=pour_z,
-                    roll=math.radians(angle * t),
-                    gripper_open=False,
-                )
-            )
+        tilt_wps = [
+            Waypoint(pour_x, pour_y, pour_z, roll, gripper_open=False)
+            for roll in _pour_tilt_profile(angle)
+        ]
 
         # Hold pour position
         wp_hold = Waypoint(
@@ -630,27 +648,8 @@ class Stack(ActionPrimitive):
         stack_y = obj.position[1] + obj_height / 2 + 0.05
         safe_y = stack_y + 0.25
 
-        # Move above target
-        wp_above = Waypoint(
-            x=obj.position[0], y=safe_y, z=obj.position[2], gripper_open=False
-        )
-
-        # Descend to stack position
-        wp_stack = Waypoint(
-            x=obj.position[0], y=stack_y, z=obj.position[2], gripper_open=False
-        )
-
-        # Release
-        wp_release = Waypoint(
-            x=obj.position[0], y=stack_y, z=obj.position[2], gripper_open=True
-        )
-
-        # Retreat
-        wp_retreat = Waypoint(
-            x=obj.position[0], y=safe_y, z=obj.position[2], gripper_open=True
-        )
-
-        return [wp_above, wp_stack, wp_release, wp_retreat]
+        # Move above target, descend to stack position, release, retreat
+        return _lower_and_release(obj.position[0], obj.position[2], stack_y, safe_y)
 
     def validate(
         self, waypoints: list[Waypoint], scene: SceneState
@@ -674,6 +673,16 @@ class Stack(ActionPrimitive):
 # ---------------------------------------------------------------------------
 
 
+SORT_COLOR_ORDER = {"red": 0, "green": 1, "blue": 2, "yellow": 3, "purple": 4, "orange": 5}
+
+
+def _color_rank(obj: SceneObject) -> int:
+    """Sort key for color sorting; unknown colors go last."""
+    # Scene colors are normally lowercase already, so try them as-is first
+    rank = SORT_COLOR_ORDER.get(obj.color)
+    return rank if rank is not None else SORT_COLOR_ORDER.get(obj.color.lower(), 99)
+
+
 class Sort(ActionPrimitive):
     primitive_id = "SORT"
     description = "Arrange multiple objects by a criterion"
@@ -689,8 +698,7 @@ class Sort(ActionPrimitive):
 
         # Sort objects by criterion
         if criterion == "color":
-            color_order = {"red": 0, "green": 1, "blue": 2, "yellow": 3, "purple": 4, "orange": 5}
-            objects.sort(key=lambda o: color_order.get(o.color.lower(), 99))
+            objects.sort(key=_color_rank)
         elif criterion == "size":
             objects.sort(key=lambda o: o.size[0] if o.size else 0)
         else:
@@ -703,42 +711,41 @@ class Sort(ActionPrimitive):
         spacing = 0.3
         start_x = -spacing * (len(objects) - 1) / 2
         place_y = scene.table_height + 0.1
+        safe_y = scene.table_height + 0.4
+        along_x = direction in ("left_to_right", "right_to_left")
 
         waypoints: list[Waypoint] = []
         for i, obj in enumerate(objects):
-            if direction in ("left_to_right", "right_to_left"):
-                place_x = start_x + i * spacing
-                place_z = 0.0
-            else:
-                place_x = 0.0
-                place_z = start_x + i * spacing
+            lane = start_x + i * spacing
+            place_x, place_z = (lane, 0.0) if along_x else (0.0, lane)
+            ox, oy, oz = obj.position
 
             # Approach, pick, transport, place for each object
-            safe_y = scene.table_height + 0.4
-            waypoints.extend([
-                Waypoint(x=obj.position[0], y=safe_y, z=obj.position[2], gripper_open=True),
-                Waypoint(x=obj.position[0], y=obj.position[1], z=obj.position[2], gripper_open=True),
-                Waypoint(x=obj.position[0], y=obj.position[1], z=obj.position[2], gripper_open=False),
-                Waypoint(x=obj.position[0], y=safe_y, z=obj.position[2], gripper_open=False),
-                Waypoint(x=place_x, y=safe_y, z=place_z, gripper_open=False),
-                Waypoint(x=place_x, y=place_y, z=place_z, gripper_open=False),
-                Waypoint(x=place_x, y=place_y, z=place_z, gripper_open=True),
-                Waypoint(x=place_x, y=safe_y, z=place_z, gripper_open=True),
-            ])
+            # (positional: x, y, z, roll, pitch, yaw, gripper_open)
+            waypoints += (
+                Waypoint(ox, safe_y, oz, 0.0, 0.0, 0.0, True),
+                Waypoint(ox, oy, oz, 0.0, 0.0, 0.0, True),
+                Waypoint(ox, oy, oz, 0.0, 0.0, 0.0, False),
+                Waypoint(ox, safe_y, oz, 0.0, 0.0, 0.0, False),
+                Waypoint(place_x, safe_y, place_z, 0.0, 0.0, 0.0, False),
+                Waypoint(place_x, place_y, place_z, 0.0, 0.0, 0.0, False),
+                Waypoint(place_x, place_y, place_z, 0.0, 0.0, 0.0, True),
+                Waypoint(place_x, safe_y, place_z, 0.0, 0.0, 0.0, True),
+            )
 
         return waypoints
 
     def validate(
         self, waypoints: list[Waypoint], scene: SceneState
     ) -> ValidationResult:
-        for i, wp in enumerate(waypoints):
-            if wp.y < scene.table_height - 0.01:
-                return ValidationResult(
-                    ValidationStatus.FAIL,
-                    f"Sort waypoint {i} below table",
-                    "table_collision",
-                    i,
-                )
+        i = _first_below(waypoints, scene.table_height - 0.01)
+        if i >= 0:
+            return ValidationResult(
+                ValidationStatus.FAIL,
+                f"Sort waypoint {i} below table",
+                "table_collision",
+                i,
+            )
         return ValidationResult(ValidationStatus.PASS, "Sort trajectory valid")
 
     def describe(self, params: dict[str, Any] | None = None) -> str:
@@ -791,14 +798,14 @@ class Inspect(ActionPrimitive):
     def validate(
         self, waypoints: list[Waypoint], scene: SceneState
     ) -> ValidationResult:
-        for i, wp in enumerate(waypoints):
-            if wp.y < scene.table_height:
-                return ValidationResult(
-                    ValidationStatus.FAIL,
-                    f"Inspect position {i} below table",
-                    "table_collision",
-                    i,
-                )
+        i = _first_below(waypoints, scene.table_height)
+        if i >= 0:
+            return ValidationResult(
+                ValidationStatus.FAIL,
+                f"Inspect position {i} below table",
+                "table_collision",
+                i,
+            )
         return ValidationResult(ValidationStatus.PASS, "Inspect position valid")
 
     def describe(self, params: dict[str, Any] | None = None) -> str:
@@ -821,13 +828,8 @@ class Wait(ActionPrimitive):
     ) -> list[Waypoint]:
         duration_ms: float = float(params.get("duration_ms", 1000))
         # A wait produces a single waypoint at current position with metadata
-        wp = Waypoint(
-            x=scene.end_effector[0],
-            y=scene.end_effector[1],
-            z=scene.end_effector[2],
-            gripper_open=scene.gripper_open,
-        )
-        return [wp]
+        x, y, z = scene.end_effector
+        return [_hold_waypoint(x, y, z, scene.gripper_open)]
 
     def validate(
         self, waypoints: list[Waypoint], scene: SceneState
@@ -863,10 +865,26 @@ PRIMITIVE_REGISTRY: dict[str, ActionPrimitive] = {
     "WAIT": Wait(),
 }
 
+# Common spellings of each primitive ID (as-is and lower-case) -> interned
+# canonical ID, so LLM/VLM output usually normalizes without allocating
+_ACTION_ID_LOOKUP: dict[str, str] = {
+    spelling: sys.intern(name)
+    for name in PRIMITIVE_REGISTRY
+    for spelling in (name, name.lower())
+}
+
+
+def canonical_action_id(action_id: str) -> str:
+    """Upper-case ``action_id`` the way the registry keys are spelled."""
+    return _ACTION_ID_LOOKUP.get(action_id) or action_id.upper()
+
 
 def get_primitive(action_id: str) -> ActionPrimitive:
     """Retrieve a primitive by ID. Raises KeyError if not found."""
-    prim = PRIMITIVE_REGISTRY.get(action_id.upper())
+    # Callers usually pass the canonical ID already; normalize only on a miss
+    prim = PRIMITIVE_REGISTRY.get(action_id)
+    if prim is None:
+        prim = PRIMITIVE_REGISTRY.get(canonical_action_id(action_id))
     if prim is None:
         raise KeyError(
             f"Unknown action primitive '{action_id}'. "
@@ -19,7 +19,20 @@ import math
 from dataclasses import dataclass, field
 from typing import Any
 
-from core.action_primitives import Waypoint, SceneState, ValidationResult, ValidationStatus
+import numpy as np
+
+from core.action_primitives import (
+    WP_ROLL,
+    WP_X,
+    WP_Y,
+    WP_YAW,
+    WP_Z,
+    SceneState,
+    ValidationResult,
+    ValidationStatus,
+    Waypoint,
+    waypoints_to_array,
+)
 
 
 # ---------------------------------------------------------------------------
@@ -72,31 +85,53 @@ class ConstraintViolation:
     severity: str = "error"  # "error" or "warning"
 
 
+Waypoints = list[Waypoint] | np.ndarray  # a list, or waypoints_to_array() of one
+_ANGLE_ATTRS = ("roll", "pitch", "yaw")  # columns WP_ROLL..WP_YAW
+
+
+def _as_array(waypoints: Waypoints) -> np.ndarray:
+    if isinstance(waypoints, np.ndarray):
+        return waypoints
+    return waypoints_to_array(waypoints)
+
+
+def _step_distances(arr: np.ndarray) -> np.ndarray:
+    """Euclidean distance of each waypoint from the previous one (N-1 values)."""
+    d = np.diff(arr[:, WP_X:WP_Z + 1], axis=0)
+    dx, dy, dz = d[:, 0], d[:, 1], d[:, 2]
+    return np.sqrt(dx * dx + dy * dy + dz * dz)
+
+
 def check_workspace_bounds(
-    waypoints: list[Waypoint],
+    waypoints: Waypoints,
     config: SafetyConfig = DEFAULT_SAFETY_CONFIG,
 ) -> list[ConstraintViolation]:
     """Verify all waypoints are within the workspace bounding box."""
     violations: list[ConstraintViolation] = []
     ws = config.workspace
-
-    for i, wp in enumerate(waypoints):
-        if wp.x < ws.x_min or wp.x > ws.x_max:
+    arr = _as_array(waypoints)
+    xs, ys, zs = arr[:, WP_X], arr[:, WP_Y], arr[:, WP_Z]
+    bad_x = (xs < ws.x_min) | (xs > ws.x_max)
+    bad_y = (ys < ws.y_min) | (ys > ws.y_max)
+    bad_z = (zs < ws.z_min) | (zs > ws.z_max)
+
+    for i in np.flatnonzero(bad_x | bad_y | bad_z).tolist():
+        if bad_x[i]:
             violations.append(ConstraintViolation(
                 "workspace_bounds_x",
-                f"Waypoint {i}: x={wp.x:.3f} outside [{ws.x_min}, {ws.x_max}]",
+                f"Waypoint {i}: x={float(xs[i]):.3f} outside [{ws.x_min}, {ws.x_max}]",
                 i,
             ))
-        if wp.y < ws.y_min or wp.y > ws.y_max:
+        if bad_y[i]:
             violations.append(ConstraintViolation(
                 "workspace_bounds_y",
-                f"Waypoint {i}: y={wp.y:.3f} outside [{ws.y_min}, {ws.y_max}]",
+                f"Waypoint {i}: y={float(ys[i]):.3f} outside [{ws.y_min}, {ws.y_max}]",
                 i,
             ))
-        if wp.z < ws.z_min or wp.z > ws.z_max:
+        if bad_z[i]:
             violations.append(ConstraintViolation(
                 "workspace_bounds_z",
-                f"Waypoint {i}: z={wp.z:.3f} outside [{ws.z_min}, {ws.z_max}]",
+                f"Waypoint {i}: z={float(zs[i]):.3f} outside [{ws.z_min}, {ws.z_max}]",
                 i,
             ))
 
@@ -104,112 +139,88 @@ def check_workspace_bounds(
 
 
 def check_table_collision(
-    waypoints: list[Waypoint],
+    waypoints: Waypoints,
     config: SafetyConfig = DEFAULT_SAFETY_CONFIG,
 ) -> list[ConstraintViolation]:
     """Verify no waypoints collide with the table surface."""
-    violations: list[ConstraintViolation] = []
     threshold = config.table_height - config.table_collision_margin
+    ys = _as_array(waypoints)[:, WP_Y]
 
-    for i, wp in enumerate(waypoints):
-        if wp.y < threshold:
-            violations.append(ConstraintViolation(
-                "table_collision",
-                f"Waypoint {i}: y={wp.y:.3f} below table surface at {config.table_height:.3f}",
-                i,
-            ))
-
-    return violations
+    return [
+        ConstraintViolation(
+            "table_collision",
+            f"Waypoint {i}: y={float(ys[i]):.3f} below table surface at {config.table_height:.3f}",
+            i,
+        )
+        for i in np.flatnonzero(ys < threshold).tolist()
+    ]
 
 
 def check_linear_velocity(
-    waypoints: list[Waypoint],
+    waypoints: Waypoints,
     config: SafetyConfig = DEFAULT_SAFETY_CONFIG,
 ) -> list[ConstraintViolation]:
     """Verify linear velocity between consecutive waypoints is within limits."""
-    violations: list[ConstraintViolation] = []
     dt = config.assumed_dt
-
-    for i in range(1, len(waypoints)):
-        prev = waypoints[i - 1]
-        curr = waypoints[i]
-
-        dx = curr.x - prev.x
-        dy = curr.y - prev.y
-        dz = curr.z - prev.z
-        dist = math.sqrt(dx * dx + dy * dy + dz * dz)
-        velocity = dist / dt
-
-        if velocity > config.max_linear_velocity_mps:
-            violations.append(ConstraintViolation(
-                "max_linear_velocity",
-                f"Waypoint {i}: linear velocity {velocity:.3f} m/s "
-                f"exceeds limit {config.max_linear_velocity_mps:.3f} m/s "
-                f"(distance {dist:.3f}m in {dt}s)",
-                i,
-            ))
-
-    return violations
+    dists = _step_distances(_as_array(waypoints))
+    velocities = dists / dt
+
+    return [
+        ConstraintViolation(
+            "max_linear_velocity",
+            f"Waypoint {j + 1}: linear velocity {float(velocities[j]):.3f} m/s "
+            f"exceeds limit {config.max_linear_velocity_mps:.3f} m/s "
+            f"(distance {float(dists[j]):.3f}m in {dt}s)",
+            j + 1,
+        )
+        for j in np.flatnonzero(velocities > config.max_linear_velocity_mps).tolist()
+    ]
 
 
 def check_angular_velocity(
-    waypoints: list[Waypoint],
+    waypoints: Waypoints,
     config: SafetyConfig = DEFAULT_SAFETY_CONFIG,
 ) -> list[ConstraintViolation]:
     """Verify angular velocity between consecutive waypoints is within limits."""
-    violations: list[ConstraintViolation] = []
     dt = config.assumed_dt
     max_rad = math.radians(config.max_angular_velocity_dps)
-
-    for i in range(1, len(waypoints)):
-        prev = waypoints[i - 1]
-        curr = waypoints[i]
-
-        for attr in ("roll", "pitch", "yaw"):
-            delta = abs(getattr(curr, attr) - getattr(prev, attr))
-            angular_vel = delta / dt
-
-            if angular_vel > max_rad:
-                violations.append(ConstraintViolation(
-                    f"max_angular_velocity_{attr}",
-                    f"Waypoint {i}: {attr} angular velocity "
-                    f"{math.degrees(angular_vel):.1f} °/s exceeds "
-                    f"limit {config.max_angular_velocity_dps:.1f} °/s",
-                    i,
-                ))
-
-    return violations
+    arr = _as_array(waypoints)
+    angular_vel = np.abs(np.diff(arr[:, WP_ROLL:WP_YAW + 1], axis=0)) / dt
+
+    # Row-major nonzero keeps the per-waypoint roll, pitch, yaw order
+    rows, cols = np.nonzero(angular_vel > max_rad)
+    return [
+        ConstraintViolation(
+            f"max_angular_velocity_{_ANGLE_ATTRS[k]}",
+            f"Waypoint {j + 1}: {_ANGLE_ATTRS[k]} angular velocity "
+            f"{math.degrees(angular_vel[j, k]):.1f} °/s exceeds "
+            f"limit {config.max_angular_velocity_dps:.1f} °/s",
+            j + 1,
+        )
+        for j, k in zip(rows.tolist(), cols.tolist())
+    ]
 
 
 def check_waypoint_distance(
-    waypoints: list[Waypoint],
+    waypoints: Waypoints,
     config: SafetyConfig = DEFAULT_SAFETY_CONFIG,
 ) -> list[ConstraintViolation]:
     """Verify no single move is unreasonably large."""
-    violations: list[ConstraintViolation] = []
-
-    for i in range(1, len(waypoints)):
-        prev = waypoints[i - 1]
-        curr = waypoints[i]
-
-        dx = curr.x - prev.x
-        dy = curr.y - prev.y
-        dz = curr.z - prev.z
-        dist = math.sqrt(dx * dx + dy * dy + dz * dz)
-
-        if dist > config.max_waypoint_distance_m:
-            violations.append(ConstraintViolation(
-                "max_waypoint_distance",
-                f"Waypoint {i}: distance {dist:.3f}m from previous "
-                f"exceeds max {config.max_waypoint_distance_m:.3f}m",
-                i,
-            ))
-
-    return violations
+    dists = _step_distances(_as_array(waypoints))
+
+    return [
+        ConstraintViolation(
+            "max_waypoint_distance",
+            f"Waypoint {j + 1}: distance {float(dists[j]):.3f}m from previous "
+            f"exceeds max {config.max_waypoint_distance_m:.3f}m",
+            j + 1,
+        )
+        for j in np.flatnonzero(dists > config.max_waypoint_distance_m).tolist()
+    ]
 
 
 def check_obstacle_clearance(
-    waypoints: list[Waypoint],
+    waypoints: Waypoints,
     scene: SceneState,
     config: SafetyConfig = DEFAULT_SAFETY_CONFIG,
 ) -> list[ConstraintViolation]:
@@ -217,34 +228,38 @@ def check_obstacle_clearance(
     Verify minimum clearance from scene obstacles.
     Uses simplified bounding-sphere collision checks.
     """
-    violations: list[ConstraintViolation] = []
     min_clearance = config.min_obstacle_clearance_m
-
-    for i, wp in enumerate(waypoints):
-        for obj_id, obj in scene.objects.items():
-            # Skip the held object
-            if obj_id == scene.held_object_id:
-                continue
-
-            # Bounding sphere radius (conservative estimate)
-            obj_radius = max(obj.size) / 2 if obj.size else 0.1
-
-            dx = wp.x - obj.position[0]
-            dy = wp.y - obj.position[1]
-            dz = wp.z - obj.position[2]
-            dist = math.sqrt(dx * dx + dy * dy + dz * dz)
-
-            clearance = dist - obj_radius
-            if clearance < min_clearance:
-                violations.append(ConstraintViolation(
-                    "obstacle_clearance",
-                    f"Waypoint {i}: clearance {clearance:.3f}m from '{obj_id}' "
-                    f"below minimum {min_clearance:.3f}m",
-                    i,
-                    severity="warning",
-                ))
-
-    return violations
+    # Skip the held object
+    obstacles = [
+        (obj_id, obj) for obj_id, obj in scene.objects.items()
+        if obj_id != scene.held_object_id
+    ]
+    arr = _as_array(waypoints)
+    if not obstacles or not len(arr):
+        return []
+
+    centers = np.array([obj.position for _, obj in obstacles], dtype=np.float64)
+    # Bounding sphere radius (conservative estimate)
+    radii = np.array([max(obj.size) / 2 if obj.size else 0.1 for _, obj in obstacles])
+
+    # (waypoints, obstacles) distance matrix
+    dx = arr[:, WP_X, None] - centers[:, 0]
+    dy = arr[:, WP_Y, None] - centers[:, 1]
+    dz = arr[:, WP_Z, None] - centers[:, 2]
+    clearance = np.sqrt(dx * dx + dy * dy + dz * dz) - radii
+
+    # Row-major order: by waypoint, then by scene object order
+    rows, cols = np.nonzero(clearance < min_clearance)
+    return [
+        ConstraintViolation(
+            "obstacle_clearance",
+            f"Waypoint {i}: clearance {float(clearance[i, k]):.3f}m from '{obstacles[k][0]}' "
+            f"below minimum {min_clearance:.3f}m",
+            i,
+            severity="warning",
+        )
+        for i, k in zip(rows.tolist(), cols.tolist())
+    ]
 
 
 # ---------------------------------------------------------------------------
@@ -307,15 +322,16 @@ def validate_trajectory(
 
     all_issues: list[ConstraintViolation] = []
 
-    # Run all constraint checks
-    all_issues.extend(check_workspace_bounds(waypoints, config))
-    all_issues.extend(check_table_collision(waypoints, config))
-    all_issues.extend(check_linear_velocity(waypoints, config))
-    all_issues.extend(check_angular_velocity(waypoints, config))
-    all_issues.extend(check_waypoint_distance(waypoints, config))
+    # Run all constraint checks on one packed copy of the trajectory
+    arr = waypoints_to_array(waypoints)
+    all_issues.extend(check_workspace_bounds(arr, config))
+    all_issues.extend(check_table_collision(arr, config))
+    all_issues.extend(check_linear_velocity(arr, config))
+    all_issues.extend(check_angular_velocity(arr, config))
+    all_issues.extend(check_waypoint_distance(arr, config))
 
     if scene is not None:
-        all_issues.extend(check_obstacle_clearance(waypoints, scene, config))
+        all_issues.extend(check_obstacle_clearance(arr, scene, config))
 
     # Separate errors from warnings
     errors = [v for v in all_issues if v.severity == "error"]
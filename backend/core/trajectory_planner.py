@@ -25,6 +25,7 @@ from core.action_primitives import (
     SceneState,
     ValidationResult,
     ValidationStatus,
+    canonical_action_id,
     get_primitive,
     PRIMITIVE_REGISTRY,
 )
@@ -177,7 +178,7 @@ def plan_trajectory(
     current_scene = copy.deepcopy(scene)
 
     for i, action_def in enumerate(actions):
-        action_id = action_def.get("action", "").upper()
+        action_id = canonical_action_id(action_def.get("action", ""))
         params = action_def.get("params", {})
 
         # Resolve primitive
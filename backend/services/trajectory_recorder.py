@@ -21,6 +21,8 @@ from typing import Any, Callable, Dict, List, Optional
 
 logger = logging.getLogger("kinesys.trajectory_recorder")
 
+REPLAY_BATCH_MAX = 16  # waypoints already due that are coalesced into one frame
+
 # ---------------------------------------------------------------------------
 # Data structures
 # ---------------------------------------------------------------------------
@@ -203,30 +205,46 @@ class TrajectoryRecorder:
             "speed_multiplier": speed_multiplier,
         })
 
-        start_real = asyncio.get_event_loop().time()
+        loop = asyncio.get_running_loop()
+        start_real = loop.time()
         origin_ms = traj.points[0].timestamp_ms
+        scale = 1000 * speed_multiplier
+        schedule = [start_real + (p.timestamp_ms - origin_ms) / scale for p in traj.points]
 
-        for i, point in enumerate(traj.points):
-            # Compute when this point should be emitted relative to start
-            relative_ms = point.timestamp_ms - origin_ms
-            scheduled_real = start_real + (relative_ms / 1000) / speed_multiplier
-
-            # Wait until scheduled time
-            now = asyncio.get_event_loop().time()
-            wait = scheduled_real - now
+        i = 0
+        while i < traj.point_count:
+            # Wait until this point is due
+            wait = schedule[i] - loop.time()
             if wait > 0:
                 await asyncio.sleep(wait)
 
-            await send_fn({
-                "type": "guide_replay_waypoint",
-                "index": i,
-                "total": traj.point_count,
-                "x": point.x,
-                "y": point.y,
-                "z": point.z,
-                "gripper_open": point.gripper_open,
-                "timestamp_ms": point.timestamp_ms,
-            })
+            # Points that fell due meanwhile (fast replay, or a late wake-up)
+            # go out in the same frame instead of one frame each
+            now = loop.time()
+            end = i + 1
+            while end < traj.point_count and end - i < REPLAY_BATCH_MAX and schedule[end] <= now:
+                end += 1
+
+            if end - i == 1:
+                point = traj.points[i]
+                await send_fn({
+                    "type": "guide_replay_waypoint",
+                    "index": i,
+                    "total": traj.point_count,
+                    "x": point.x,
+                    "y": point.y,
+                    "z": point.z,
+                    "gripper_open": point.gripper_open,
+                    "timestamp_ms": point.timestamp_ms,
+                })
+            else:
+                await send_fn({
+                    "type": "guide_replay_waypoints",
+                    "start_index": i,
+                    "total": traj.point_count,
+                    "points": [p.to_dict() for p in traj.points[i:end]],
+                })
+            i = end
 
         await send_fn({
             "type": "guide_replay_done",
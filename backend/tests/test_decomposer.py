@@ -12,18 +12,31 @@ Tests the LLM integration pipeline with mocked LLM responses:
 
 from __future__ import annotations
 
+import asyncio
 import json
 import math
+from dataclasses import replace
 from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
 import pytest
 
 from core.action_primitives import SceneObject, SceneState
-from ai.llm_client import LLMClient, LLMResponse, LLMProvider, RateLimitError
+from ai.llm_client import (
+    LLMClient,
+    LLMResponse,
+    LLMProvider,
+    GroqClient,
+    RateLimitError,
+    _wrap_decoded_response,
+)
+from ai.procedure_extractor import ProcedureCache, extract_procedure
 from ai.scene_analyzer import (
     SceneGraph,
     SpatialRelation,
     analyze_scene,
     compute_spatial_relations,
+    describe_scene,
     scene_state_from_frontend,
 )
 from ai.task_decomposer import (
@@ -33,6 +46,7 @@ from ai.task_decomposer import (
     _validate_actions,
     _load_decompose_prompt,
 )
+from ai.vlm_client import VLMResponse, _inference_slot
 
 
 # ---------------------------------------------------------------------------
@@ -121,6 +135,54 @@ class TestSceneAnalyzer:
         assert ("a", "left_of", "b") in rel_strs
         assert ("b", "right_of", "a") in rel_strs
 
+    def test_large_scene_uses_nearest_directional_neighbors(self) -> None:
+        objects = [
+            SceneObject(id=f"o{i:02d}", shape="box", color="red",
+                        position=(i * 0.5, 0.5, 0.0), size=(0.1,))
+            for i in range(12)
+        ]
+        objects.append(SceneObject(id="o00_top", shape="box", color="red",
+                                   position=(0.0, 0.6, 0.0), size=(0.1,)))
+        relations = compute_spatial_relations(objects)
+        rel_strs = {(r.subject, r.relation, r.object) for r in relations}
+        assert ("o00", "left_of", "o01") in rel_strs
+        assert ("o00", "left_of", "o02") not in rel_strs
+        assert ("o05", "right_of", "o04") in rel_strs
+        assert ("o00_top", "on_top_of", "o00") in rel_strs
+        assert ("o00", "near", "o00_top") in rel_strs
+
+    def test_large_scene_directional_closure_matches_all_pairs(self) -> None:
+        # Tied coordinates: each column shares x, each row shares z
+        objects = [
+            SceneObject(id=f"o{c}{r}", shape="box", color="red",
+                        position=(x, 0.6, z), size=(0.1,))
+            for c, x in enumerate((0.0, 0.2, 0.5, 0.9))
+            for r, z in enumerate((0.0, 0.35, 0.7))
+        ]
+
+        def directional(relations: list[SpatialRelation]) -> dict[str, set[tuple[str, str]]]:
+            by_name: dict[str, set[tuple[str, str]]] = {}
+            for r in relations:
+                if r.relation not in ("near", "on_top_of"):
+                    by_name.setdefault(r.relation, set()).add((r.subject, r.object))
+            return by_name
+
+        def closure(pairs: set[tuple[str, str]]) -> set[tuple[str, str]]:
+            while True:
+                extra = {(a, d) for a, b in pairs for c, d in pairs if b == c} - pairs
+                if not extra:
+                    return pairs
+                pairs = pairs | extra
+
+        indexed = directional(compute_spatial_relations(objects))
+        with patch("ai.scene_analyzer.SPATIAL_INDEX_MIN_OBJECTS", 100):
+            all_pairs = directional(compute_spatial_relations(objects))
+
+        assert indexed.keys() == all_pairs.keys()
+        for name, pairs in all_pairs.items():
+            assert indexed[name] <= pairs
+            assert closure(indexed[name]) == pairs, name
+
     def test_scene_graph_to_dict(self, scene: SceneState) -> None:
         graph = analyze_scene(scene)
         d = graph.to_dict()
@@ -151,6 +213,28 @@ class TestSceneAnalyzer:
         assert state.objects["cube1"].position == (0.5, 0.6, 0.3)
         assert state.gripper_open is True
 
+    def test_describe_scene_ignores_object_order(self, scene: SceneState) -> None:
+        reordered = SceneState(
+            objects=dict(reversed(list(scene.objects.items()))),
+            end_effector=scene.end_effector,
+            table_height=scene.table_height,
+        )
+        assert describe_scene(reordered) == describe_scene(scene)
+        assert describe_scene(scene) == analyze_scene(scene).to_description()
+
+    def test_describe_scene_changes_with_scene(self, scene: SceneState) -> None:
+        before = describe_scene(scene)
+        scene.gripper_open = False
+        assert describe_scene(scene) != before
+
+    def test_analyze_scene_memoized(self, scene: SceneState) -> None:
+        graph = analyze_scene(scene)
+        assert analyze_scene(scene) is graph
+        scene.objects["red_cube"] = replace(
+            scene.objects["red_cube"], position=(0.9, 0.6, 0.3)
+        )
+        assert analyze_scene(scene) is not graph
+
     def test_spatial_relation_to_natural_language(self) -> None:
         rel = SpatialRelation("a", "on_top_of", "b")
         assert rel.to_natural_language() == "a is on top of b"
@@ -250,6 +334,11 @@ class TestLLMResponseParsing:
         parsed = resp.parse_json()
         assert isinstance(parsed, list)
 
+    def test_parse_truncated_json_raises(self) -> None:
+        resp = _mock_llm_response('  {"action": "WAIT"')
+        with pytest.raises(ValueError, match="not valid JSON"):
+            resp.parse_json()
+
     def test_parse_invalid_json_raises(self) -> None:
         resp = _mock_llm_response("This is not JSON at all")
         with pytest.raises(ValueError, match="not valid JSON"):
@@ -273,8 +362,9 @@ class TestPromptLoading:
         prompt = _load_decompose_prompt()
         assert "KINESYS" in prompt
         assert "APPROACH" in prompt
-        assert "{scene_description}" in prompt
-        assert "{user_command}" in prompt
+        # Static prompt: scene and command are sent in the user message
+        assert "{scene_description}" not in prompt
+        assert "{user_command}" not in prompt
 
     def test_prompt_contains_examples(self) -> None:
         prompt = _load_decompose_prompt()
@@ -317,6 +407,20 @@ class TestDecomposer:
         assert result.actions[1]["action"] == "GRASP"
         assert result.provider == LLMProvider.GROQ
 
+    @pytest.mark.asyncio
+    async def test_scene_and_command_sent_as_user_message(self, scene: SceneState) -> None:
+        mock_client = AsyncMock(spec=LLMClient)
+        mock_client.chat = AsyncMock(return_value=_mock_llm_response(json.dumps([
+            {"action": "INSPECT", "params": {"target": "red_cube"}},
+        ])))
+
+        await decompose_command("Look at the red cube", scene, llm_client=mock_client)
+
+        system, user = mock_client.chat.call_args.kwargs["messages"]
+        assert system["content"] == _load_decompose_prompt()
+        assert "red_cube" in user["content"]
+        assert user["content"].endswith("Look at the red cube")
+
     @pytest.mark.asyncio
     async def test_sort_command(self, scene: SceneState) -> None:
         mock_response = _mock_llm_response(json.dumps([
@@ -494,3 +598,386 @@ class TestDecomposer:
         )
 
         assert not result.success
+
+
+# ---------------------------------------------------------------------------
+# LLM Client Fallback Tests (mocked providers)
+# ---------------------------------------------------------------------------
+
+
+def _llm_client(hedge_delay: float | None = 0.01) -> LLMClient:
+    return LLMClient(
+        groq_api_key="test-groq",
+        gemini_api_key="test-gemini",
+        hedge_delay=hedge_delay,
+    )
+
+
+class TestLLMClientFallback:
+    @pytest.mark.asyncio
+    async def test_fast_groq_skips_gemini(self) -> None:
+        client = _llm_client()
+        client.groq.chat = AsyncMock(return_value=_mock_llm_response("{}"))
+        client.gemini.chat = AsyncMock()
+
+        result = await client.chat([{"role": "user", "content": "hi"}])
+
+        assert result.provider == LLMProvider.GROQ
+        client.gemini.chat.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_slow_groq_is_hedged_by_gemini(self) -> None:
+        async def slow_groq(*args: object) -> LLMResponse:
+            await asyncio.sleep(1.0)
+            return _mock_llm_response("{}")
+
+        client = _llm_client()
+        client.groq.chat = slow_groq
+        client.gemini.chat = AsyncMock(
+            return_value=_mock_llm_response("{}", provider=LLMProvider.GEMINI)
+        )
+
+        result = await client.chat([{"role": "user", "content": "hi"}])
+
+        assert result.provider == LLMProvider.GEMINI
+        assert client.active_provider == LLMProvider.GROQ
+
+    @pytest.mark.asyncio
+    async def test_both_cloud_failures_fall_back_to_ollama(self) -> None:
+        client = _llm_client(hedge_delay=None)
+        client.groq.chat = AsyncMock(side_effect=RateLimitError("429"))
+        client.gemini.chat = AsyncMock(side_effect=RuntimeError("503"))
+        client.ollama.chat = AsyncMock(
+            return_value=_mock_llm_response("{}", provider=LLMProvider.OLLAMA)
+        )
+
+        result = await client.chat([{"role": "user", "content": "hi"}])
+
+        assert result.provider == LLMProvider.OLLAMA
+        assert client.active_provider == LLMProvider.OLLAMA
+
+    @pytest.mark.asyncio
+    async def test_failed_provider_recovers_after_cooldown(self) -> None:
+        client = _llm_client(hedge_delay=None)
+        client.groq.chat = AsyncMock(side_effect=RateLimitError("429"))
+        client.gemini.chat = AsyncMock(
+            return_value=_mock_llm_response("{}", provider=LLMProvider.GEMINI)
+        )
+
+        await client.chat([{"role": "user", "content": "hi"}], cache_bypass=True)
+        assert client.active_provider == LLMProvider.GEMINI
+
+        client._skip_until[LLMProvider.GROQ] = 0.0  # cooldown elapsed
+        assert client.active_provider == LLMProvider.GROQ
+
+    @pytest.mark.asyncio
+    async def test_deterministic_responses_are_cached(self) -> None:
+        client = _llm_client()
+        client.groq.chat = AsyncMock(return_value=_mock_llm_response("{}"))
+        messages = [{"role": "user", "content": "hi"}]
+
+        first = await client.chat(messages, temperature=0.0)
+        second = await client.chat(messages, temperature=0.0)
+        await client.chat(messages, temperature=0.0, cache_bypass=True)
+
+        assert second is first
+        assert client.groq.chat.call_count == 2
+        assert client.cache_stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_fallback_responses_are_not_cached(self) -> None:
+        client = _llm_client(hedge_delay=None)
+        client.groq.chat = AsyncMock(side_effect=RateLimitError("429"))
+        client.gemini.chat = AsyncMock(side_effect=RuntimeError("503"))
+        client.ollama.chat = AsyncMock(
+            return_value=_mock_llm_response("{}", provider=LLMProvider.OLLAMA)
+        )
+        messages = [{"role": "user", "content": "hi"}]
+
+        await client.chat(messages, temperature=0.0)
+        client._skip_until[LLMProvider.GROQ] = 0.0  # Groq recovers
+        client.groq.chat = AsyncMock(return_value=_mock_llm_response("{}"))
+        result = await client.chat(messages, temperature=0.0)
+
+        assert result.provider == LLMProvider.GROQ
+        assert client.cache_stats()["size"] == 1
+
+    @pytest.mark.asyncio
+    async def test_first_decomposer_attempt_is_not_cached(self) -> None:
+        client = _llm_client()
+        client.groq.chat = AsyncMock(return_value=_mock_llm_response("{}"))
+        messages = [{"role": "user", "content": "hi"}]
+
+        await client.chat(messages, temperature=0.1)
+        await client.chat(messages, temperature=0.1)
+
+        assert client.groq.chat.call_count == 2
+        assert client.cache_stats()["size"] == 0
+
+    @pytest.mark.asyncio
+    async def test_groq_model_fallback_uses_new_idempotency_key(self) -> None:
+        request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+        backend = MagicMock()
+        backend.post = AsyncMock(side_effect=[
+            httpx.Response(
+                400, json={"error": {"message": "model not found"}}, request=request
+            ),
+            httpx.Response(
+                200,
+                json={"choices": [{"message": {"content": "{}"}}], "model": "fallback"},
+                request=request,
+            ),
+        ])
+        client = GroqClient(api_key="test-groq", model="missing-model")
+
+        with patch("ai.llm_client.get_http_backend", return_value=backend):
+            result = await client.chat([{"role": "user", "content": "hi"}])
+
+        first, second = (
+            c.kwargs["headers"]["Idempotency-Key"] for c in backend.post.call_args_list
+        )
+        assert result.content == "{}"
+        assert first != second
+
+    @pytest.mark.asyncio
+    async def test_batched_requests_are_dispatched_concurrently(self) -> None:
+        in_flight = 0
+        peak = 0
+
+        async def groq(messages: list, *args: object) -> LLMResponse:
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return _mock_llm_response(messages[0]["content"])
+
+        client = LLMClient(groq_api_key="test-groq", batch=True, batch_window_ms=5)
+        client.groq.chat = groq
+
+        results = await asyncio.gather(*(
+            client.chat([{"role": "user", "content": str(i)}], cache_bypass=True)
+            for i in range(3)
+        ))
+        await client.close()
+
+        assert [r.content for r in results] == ["0", "1", "2"]
+        assert peak == 3
+
+    @pytest.mark.asyncio
+    async def test_close_cancels_pending_batched_requests(self) -> None:
+        started = asyncio.Event()
+
+        async def groq(*args: object) -> LLMResponse:
+            started.set()
+            await asyncio.sleep(10)
+            return _mock_llm_response("{}")
+
+        client = LLMClient(groq_api_key="test-groq", batch=True, batch_window_ms=5)
+        client.groq.chat = groq
+        in_flight = asyncio.create_task(
+            client.chat([{"role": "user", "content": "0"}], cache_bypass=True)
+        )
+        await started.wait()
+        queued = asyncio.create_task(
+            client.chat([{"role": "user", "content": "1"}], cache_bypass=True)
+        )
+        await asyncio.sleep(0)
+
+        await client.close()
+        done, _ = await asyncio.wait({in_flight, queued}, timeout=1.0)
+
+        assert done == {in_flight, queued}
+        assert in_flight.cancelled() and queued.cancelled()
+
+    @pytest.mark.asyncio
+    async def test_identical_concurrent_requests_share_one_call(self) -> None:
+        async def groq(*args: object) -> LLMResponse:
+            await asyncio.sleep(0.01)
+            return _mock_llm_response("{}")
+
+        client = _llm_client()
+        client.groq.chat = AsyncMock(side_effect=groq)
+        messages = [{"role": "user", "content": "hi"}]
+
+        first, second = await asyncio.gather(
+            client.chat(messages, temperature=0.0),
+            client.chat(messages, temperature=0.0),
+        )
+
+        assert first is second
+        assert client.groq.chat.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_async_context_manager_closes_client(self) -> None:
+        async with _llm_client() as client:
+            client.close = AsyncMock()
+            assert isinstance(client, LLMClient)
+
+        client.close.assert_awaited_once()
+
+
+class TestAiohttpResponseWrapping:
+    def test_gzip_headers_dropped_from_decoded_body(self) -> None:
+        # aiohttp has already inflated the body but passes the wire headers on
+        body = b'{"choices": []}'
+        request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+
+        resp = _wrap_decoded_response(
+            200,
+            [
+                ("Content-Type", "application/json"),
+                ("Content-Encoding", "gzip"),
+                ("Content-Length", "35"),
+                ("Transfer-Encoding", "chunked"),
+            ],
+            body,
+            request,
+        )
+
+        assert resp.json() == {"choices": []}
+        assert "content-encoding" not in resp.headers
+        assert resp.headers["content-type"] == "application/json"
+
+
+# ---------------------------------------------------------------------------
+# Procedure Cache Tests (mocked VLM)
+# ---------------------------------------------------------------------------
+
+
+_PICK_ANSWER = json.dumps({
+    "actions": [
+        {"step": 1, "action": "GRASP", "params": {"target": "red_cube"},
+         "confidence": 0.6, "observation": "hand closes on cube"},
+    ],
+    "summary": "pick up the red cube",
+})
+
+
+def _vlm_client(content: str = _PICK_ANSWER) -> MagicMock:
+    client = MagicMock()
+    client.analyze_images = AsyncMock(
+        return_value=VLMResponse(content=content, model="test-vlm")
+    )
+    return client
+
+
+class TestVLMHostSlots:
+    def test_slots_work_across_event_loops(self) -> None:
+        async def contend() -> None:
+            async def hold() -> None:
+                async with _inference_slot("http://test-host"):
+                    await asyncio.sleep(0.01)
+
+            await asyncio.gather(*(hold() for _ in range(4)))
+
+        # e.g. a uvicorn reload: the second loop must not reuse the first's semaphore
+        asyncio.run(contend())
+        asyncio.run(contend())
+
+
+class TestProcedureFrames:
+    @pytest.mark.asyncio
+    async def test_recurring_frames_sent_once_and_numbered(self) -> None:
+        master = _vlm_client()
+
+        result = await extract_procedure(
+            ["frame_a", "frame_b", "frame_a", "frame_c"], master
+        )
+
+        kwargs = master.analyze_images.call_args.kwargs
+        assert kwargs["images_base64"] == ["frame_a", "frame_b", "frame_c"]
+        assert "3 distinct keyframe images" in kwargs["user_prompt"]
+        assert "1, 2, 1, 3" in kwargs["user_prompt"]
+        assert result.frame_count == 4
+
+    @pytest.mark.asyncio
+    async def test_distinct_frames_use_plain_count(self) -> None:
+        master = _vlm_client()
+
+        await extract_procedure(["frame_a", "frame_b", "frame_c"], master)
+
+        prompt = master.analyze_images.call_args.kwargs["user_prompt"]
+        assert "I am showing you 3 keyframe images" in prompt
+        assert "frame 3 is latest" in prompt
+
+
+class TestProcedureCache:
+    FRAMES = ["frame_a", "frame_b", "frame_c", "frame_d"]
+
+    @pytest.mark.asyncio
+    async def test_repeat_demonstration_skips_vlm(self) -> None:
+        cache = ProcedureCache()
+        master = _vlm_client()
+
+        first = await extract_procedure(self.FRAMES, master, cache=cache)
+        second = await extract_procedure(self.FRAMES, master, cache=cache)
+
+        assert master.analyze_images.call_count == 1
+        assert second.success
+        assert second.summary == first.summary
+
+    @pytest.mark.asyncio
+    async def test_reordered_demonstration_is_not_a_hit(self) -> None:
+        cache = ProcedureCache()
+        master = _vlm_client()
+        apprentice = _vlm_client()
+
+        await extract_procedure(self.FRAMES, master, cache=cache)
+        await extract_procedure(
+            self.FRAMES[::-1], master, cache=cache, apprentice_client=apprentice
+        )
+
+        assert master.analyze_images.call_count == 2
+        apprentice.analyze_images.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_near_duplicate_goes_to_apprentice(self) -> None:
+        cache = ProcedureCache()
+        master = _vlm_client()
+        apprentice = _vlm_client()
+
+        await extract_procedure(self.FRAMES, master, cache=cache)
+        await extract_procedure(
+            ["frame_a", "frame_b", "frame_c", "frame_e"],
+            master, cache=cache, apprentice_client=apprentice,
+        )
+
+        assert master.analyze_images.call_count == 1
+        prompt = apprentice.analyze_images.call_args.kwargs["user_prompt"]
+        assert "pick up the red cube" in prompt
+
+    @pytest.mark.asyncio
+    async def test_cached_answer_revalidated_against_threshold(self) -> None:
+        cache = ProcedureCache()
+        master = _vlm_client()
+
+        lenient = await extract_procedure(
+            self.FRAMES, master, confidence_threshold=0.5, cache=cache
+        )
+        strict = await extract_procedure(
+            self.FRAMES, master, confidence_threshold=0.9, cache=cache
+        )
+
+        assert master.analyze_images.call_count == 1
+        assert not lenient.actions[0].needs_confirmation
+        assert strict.actions[0].needs_confirmation
+
+    def test_lookup_is_order_aware(self) -> None:
+        cache = ProcedureCache()
+        cache.insert((b"a", b"b", b"c", b"d"), "pick-then-place")
+
+        assert cache.get((b"d", b"c", b"b", b"a")) is None
+        assert cache.lookup((b"d", b"c", b"b", b"a")) == (None, 0.0)
+        assert cache.lookup((b"a", b"b", b"c", b"e")) == ("pick-then-place", 0.75)
+
+    def test_least_recently_used_entry_evicted(self) -> None:
+        cache = ProcedureCache(max_size=2)
+        cache.insert((b"a",), "first")
+        cache.insert((b"b",), "second")
+        cache.get((b"a",))  # refresh "first"
+        cache.insert((b"c",), "third")
+
+        assert len(cache) == 2
+        assert cache.get((b"b",)) is None
+        assert cache.get((b"a",)) == "first"
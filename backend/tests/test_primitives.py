@@ -19,6 +19,7 @@ from core.action_primitives import (
     SceneState,
     ValidationStatus,
     get_primitive,
+    canonical_action_id,
     PRIMITIVE_REGISTRY,
     Approach,
     Grasp,
@@ -107,6 +108,11 @@ class TestRegistry:
         with pytest.raises(KeyError, match="Unknown action primitive"):
             get_primitive("NONEXISTENT")
 
+    def test_canonical_action_id(self) -> None:
+        assert canonical_action_id("grasp") == "GRASP"
+        assert canonical_action_id("Grasp") == "GRASP"
+        assert canonical_action_id("fly") == "FLY"
+
     def test_all_primitives_have_ids(self) -> None:
         for name, prim in PRIMITIVE_REGISTRY.items():
             assert prim.primitive_id == name
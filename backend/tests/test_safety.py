@@ -17,7 +17,7 @@ from __future__ import annotations
 import math
 import pytest
 
-from core.action_primitives import Waypoint, SceneObject, SceneState
+from core.action_primitives import Waypoint, SceneObject, SceneState, waypoints_to_array
 from core.safety_validator import (
     SafetyConfig,
     WorkspaceBounds,
@@ -290,6 +290,29 @@ class TestMasterValidator:
         assert "error_count" in d
         assert "summary" in d
 
+    def test_violations_ordered_by_waypoint(self, scene: SceneState, config: SafetyConfig) -> None:
+        wps = [
+            _make_wp(0, 1.0, 0),
+            _make_wp(2.0, -0.5, 0, roll=math.radians(120)),  # out of x/y, fast, below table
+            _make_wp(0.5, 0.7, 0.3),  # inside red_cube's bounding sphere
+            _make_wp(0.5, 0.7, -2.0),  # out of z
+        ]
+        result = validate_trajectory(wps, scene, config)
+        assert [v.constraint_name for v in result.violations[:3]] == [
+            "workspace_bounds_x", "workspace_bounds_y", "workspace_bounds_z",
+        ]
+        assert [v.waypoint_index for v in result.violations[:3]] == [1, 1, 3]
+        assert any(v.constraint_name == "max_angular_velocity_roll" for v in result.violations)
+        assert [(w.waypoint_index, "red_cube" in w.message) for w in result.warnings] == [(2, True)]
+
+    def test_accepts_packed_waypoints(self, scene: SceneState, config: SafetyConfig) -> None:
+        wps = [_make_wp(0, 1.0, 0), _make_wp(1.8, 0.2, 0), _make_wp(0.5, 0.7, 0.3)]
+        arr = waypoints_to_array(wps)
+        assert arr.shape == (3, 7)
+        for check in (check_workspace_bounds, check_table_collision, check_linear_velocity):
+            assert check(arr, config) == check(wps, config)
+        assert check_obstacle_clearance(arr, scene, config) == check_obstacle_clearance(wps, scene, config)
+
 
 # ---------------------------------------------------------------------------
 # Trajectory Planner Integration
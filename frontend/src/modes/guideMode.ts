@@ -114,6 +114,9 @@ class GuideModeController {
   /** Current gripper state (hysteresis) */
   private gripperOpen = true;
 
+  /** Gripper state of the last replayed point (null before the first) */
+  private replayGripperOpen: boolean | null = null;
+
   /** Workspace mapping config */
   private mapping: WorkspaceMapping = { ...DEFAULT_WORKSPACE_MAPPING };
 
@@ -416,6 +419,7 @@ class GuideModeController {
         break;
 
       case "guide_replay_start":
+        this.replayGripperOpen = null;
         this.setState({
           replaying: true,
           replayTotal: msg.point_count as number,
@@ -424,27 +428,20 @@ class GuideModeController {
         });
         break;
 
-      case "guide_replay_waypoint": {
-        const index = msg.index as number;
-        const total = msg.total as number;
-
-        // Drive the arm to the replayed position
-        const x = msg.x as number;
-        const y = msg.y as number;
-        const z = msg.z as number;
-
-        armController.moveToPosition(x, y, z, 6.0).catch(() => {});
-
-        // Set gripper
-        if (msg.gripper_open) {
-          armController.openGripper();
-        } else {
-          armController.closeGripper();
-        }
+      case "guide_replay_waypoint":
+        this.applyReplayPoint(msg, msg.index as number, msg.total as number);
+        break;
 
-        this.setState({
-          replayProgress: index + 1,
-          replayTotal: total,
+      case "guide_replay_waypoints": {
+        // Points that fell due together. Pose-only points in between are
+        // skipped, but every gripper open/close must still happen at its pose
+        const points = msg.points as Record<string, unknown>[];
+        const start = msg.start_index as number;
+        points.forEach((point, i) => {
+          const isLast = i === points.length - 1;
+          if (isLast || Boolean(point.gripper_open) !== this.replayGripperOpen) {
+            this.applyReplayPoint(point, start + i, msg.total as number);
+          }
         });
         break;
       }
@@ -473,6 +470,33 @@ class GuideModeController {
     }
   };
 
+  private applyReplayPoint(point: Record<string, unknown>, index: number, total: number): void {
+    // Drive the arm to the replayed position
+    const x = point.x as number;
+    const y = point.y as number;
+    const z = point.z as number;
+
+    const gripperOpen = Boolean(point.gripper_open);
+    this.replayGripperOpen = gripperOpen;
+
+    // Moves are queued, so set the gripper once the arm reaches this point
+    armController
+      .moveToPosition(x, y, z, 6.0)
+      .catch(() => {})
+      .then(() => {
+        if (gripperOpen) {
+          armController.openGripper();
+        } else {
+          armController.closeGripper();
+        }
+      });
+
+    this.setState({
+      replayProgress: index + 1,
+      replayTotal: total,
+    });
+  }
+
   // -----------------------------------------------------------------------
   // State management
   // -----------------------------------------------------------------------